@@ -0,0 +1,91 @@
+import asyncio
+import os
+
+import botlog
+
+log = botlog.get_logger('auth')
+
+class Allowlist:
+    """Who's allowed to talk to Calliope - loaded once, O(1) to check
+
+    IDs come from AUTHORIZED_USER_ID (one id, or several separated by commas) and,
+    optionally, a file named by AUTHORIZED_USERS_FILE with one id per line (# for
+    comments). The file is watched and reloaded when it changes, no restart needed.
+    The owner is OWNER_USER_ID, or else the first AUTHORIZED_USER_ID - so with
+    only a file, set OWNER_USER_ID or nobody gets the owner-only commands.
+    """
+
+    def __init__(self, env_ids=None, path=None, owner_id=None):
+        self.env_ids = parse_ids(os.environ.get('AUTHORIZED_USER_ID', '') if env_ids is None else env_ids)
+        self.path = path if path is not None else os.environ.get('AUTHORIZED_USERS_FILE')
+        self.file_ids = set()
+        self.file_mtime = None
+        self.watcher = None
+
+        # The owner gets the extra stuff like the stats command
+        owner = owner_id if owner_id is not None else os.environ.get('OWNER_USER_ID')
+        owner_ids = parse_ids(str(owner)) if owner else []
+        self.owner_id = owner_ids[0] if owner_ids else (self.env_ids[0] if self.env_ids else None)
+
+        self.ids = frozenset(self.env_ids)
+        self.reload()
+
+    def reload(self):
+        """Re-read the allowlist file if it changed since last time"""
+        if not self.path:
+            return False
+
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except FileNotFoundError:
+            mtime = None
+
+        if mtime == self.file_mtime:
+            return False
+
+        file_ids = set()
+        if mtime is not None:
+            with open(self.path) as f:
+                for line in f:
+                    file_ids.update(parse_ids(line.split('#', 1)[0]))
+
+        self.file_mtime = mtime
+        self.file_ids = file_ids
+        # Swap in a fresh frozenset so readers never see a half-built one
+        self.ids = frozenset(self.env_ids) | frozenset(file_ids)
+        log.info("🔐 Allowlist loaded", users=len(self.ids), path=self.path)
+        return True
+
+    async def watch(self, interval=5):
+        """Poll the file's mtime in the background (call from on_ready)"""
+        if not self.path or self.watcher is not None:
+            return
+
+        async def poll():
+            while True:
+                await asyncio.sleep(interval)
+                try:
+                    self.reload()
+                except OSError:
+                    log.exception("❌ Could not reload allowlist", path=self.path)
+
+        self.watcher = asyncio.create_task(poll())
+
+    def is_owner(self, user_id):
+        return user_id == self.owner_id
+
+    def __contains__(self, user_id):
+        return user_id in self.ids
+
+    def __len__(self):
+        return len(self.ids)
+
+def parse_ids(text):
+    """'123, 456' -> [123, 456], skipping anything that isn't a number"""
+    ids = []
+    for part in text.replace(',', ' ').split():
+        try:
+            ids.append(int(part))
+        except ValueError:
+            log.warning("⚠️ Ignoring bad user id", value=part)
+    return ids
@@ -0,0 +1,594 @@
+"""Offline benchmarks for Calliope - no Discord connection or API keys needed
+
+    python benchmark.py routing                      # run and print the report
+    python benchmark.py routing --save-baseline      # remember this run as the baseline
+    python benchmark.py routing --check              # fail if we got slower than the baseline
+    python benchmark.py intents                      # intent matching as the pattern count grows
+    python benchmark.py digest --latency 0.2         # morning digest against the provider stand-in
+    python benchmark.py timers --size 50000          # timing wheel vs one asyncio task per timer
+    python benchmark.py recovery --size 50000        # journal that many timers, then restart and restore them
+    python benchmark.py history --size 1000000       # focus stats over that many past sessions
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+# Keep the benchmark quiet and offline before any bot modules get imported
+os.environ.setdefault('LOG_LEVEL', 'CRITICAL')
+for key in ('OPENWEATHER_API_KEY', 'NEWS_API_KEY', 'STOCK_API_KEY', 'METRICS_PORT'):
+    os.environ.pop(key, None)
+# ...and keep whatever they save away from the real data dir
+os.environ['CALLIOPE_DATA_DIR'] = tempfile.mkdtemp(prefix='calliope-bench-')
+
+BASELINE_FILE = 'bench_baseline.json'
+
+# Synthetic DMs, roughly the mix a real day looks like
+CORPUS_TEMPLATES = {
+    'greeting': ["hi", "hello!", "hey calliope", "ohayo~", "yo what's up"],
+    'study': ["study for {n} minutes", "let's study for {n} minutes", "pomo {n}", "focus for {n} min",
+              "take a {n} minute break", "time left?", "stop timer"],
+    'digest': ["morning digest", "good morning", "daily briefing please", "weather update", "tech news", "stock update"],
+    'rant': ["i need to vent", "rant zone", "i'm so frustrated with this class", "having a rough day"],
+    'easter_egg': ["tsundere mode", "cat mode", "you're cute", "thank you", "tell me a joke"],
+    'noise': ["lol", "what do you think about pineapple on pizza", "ok", "hmm interesting",
+              "i was reading about octopuses today and they have three hearts", "brb"],
+}
+
+# Phrasings that have gone to the wrong feature before -> where they belong
+# (the routing benchmark fails if any of them lands somewhere else)
+ROUTING_CASES = [
+    ("what time will it rain", "morning"),
+    ("will it rain in 30 minutes", "morning"),
+    ("is it going to rain at 5pm", "morning"),
+    ("when is the warmest part of the day", "morning"),
+    ("weather update", "morning"),
+    ("study for 25 minutes", "pomodoro"),
+    ("time left?", "pomodoro"),
+    ("stop timer", "pomodoro"),
+    ("what's my streak", "pomodoro"),
+    ("weekly stats", "pomodoro"),
+]
+
+class FakeChannel:
+    """In-memory stand-in for message.channel"""
+
+    def __init__(self):
+        self.sent = []
+
+    async def send(self, content=None, **kwargs):
+        message = FakeMessage(content, FakeUser(0), self)
+        self.sent.append(message)
+        return message
+
+class FakeUser:
+    def __init__(self, user_id):
+        self.id = user_id
+        self.name = f"user{user_id}"
+
+    async def create_dm(self):
+        return FakeChannel()
+
+class FakeMessage:
+    def __init__(self, content, author, channel):
+        self.content = content
+        self.author = author
+        self.channel = channel
+
+    async def edit(self, content=None, **kwargs):
+        self.content = content
+        return self
+
+def build_corpus(size, seed=1234, users=50):
+    """Deterministic list of (category, FakeMessage)"""
+    rng = random.Random(seed)
+    categories = list(CORPUS_TEMPLATES)
+    corpus = []
+    for _ in range(size):
+        category = rng.choice(categories)
+        text = rng.choice(CORPUS_TEMPLATES[category]).format(n=rng.choice([5, 15, 25, 50]))
+        author = FakeUser(rng.randrange(1, users + 1))
+        corpus.append((category, FakeMessage(text, author, FakeChannel())))
+    return corpus
+
+class no_sleep:
+    """Patch asyncio.sleep so handlers don't wait around (still yields to the loop)"""
+
+    def __enter__(self):
+        self.real_sleep = asyncio.sleep
+        real_sleep = self.real_sleep
+
+        async def instant_sleep(delay, result=None):
+            await real_sleep(0)
+            return result
+
+        asyncio.sleep = instant_sleep
+        return self
+
+    def __exit__(self, *exc):
+        asyncio.sleep = self.real_sleep
+
+async def cancel_background_tasks():
+    """Timers etc. keep running after handle() returns - tidy them up"""
+    current = asyncio.current_task()
+    tasks = [task for task in asyncio.all_tasks() if task is not current]
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+async def bench_routing(size):
+    """Push the corpus through handle_message, then through each feature's handle"""
+    import main
+    from context import MessageContext
+    from metrics import Histogram
+
+    from outbox import Outbox
+
+    corpus = build_corpus(size)
+    per_intent = {}
+    sends = 0
+
+    # We're measuring our own overhead, not Discord's rate limits
+    main.outbox = Outbox(channel_rate=1e9, channel_burst=1e9, global_rate=1e9, global_burst=1e9)
+
+    # Fast is no good if it's going to the wrong place
+    per_route = {}
+    for text, expected in ROUTING_CASES:
+        ctx = MessageContext(FakeMessage(text, FakeUser(1), FakeChannel()), main.router, main.keyword_index, main.sessions)
+        per_route[text] = {'count': 1, 'expected': expected, 'got': await main.pick_feature(ctx)}
+    misrouted = [text for text, route in per_route.items() if route['got'] != route['expected']]
+
+    with no_sleep():
+        # Warm up the compiled matchers and caches
+        for _, message in corpus[:200]:
+            await main.handle_message(MessageContext(message, main.router, main.keyword_index, main.sessions, main.outbox))
+        await main.outbox.drain()
+        await cancel_background_tasks()
+
+        started = time.perf_counter()
+        for _, message in corpus:
+            message_start = time.perf_counter()
+            ctx = MessageContext(message, main.router, main.keyword_index, main.sessions, main.outbox)
+            await main.handle_message(ctx)
+            winner = ctx.intents.best()
+            intent = f"{winner.namespace}.{winner.name}" if winner else "casual"
+            per_intent.setdefault(intent, Histogram()).observe(time.perf_counter() - message_start)
+        await main.outbox.drain()
+        pipeline_seconds = time.perf_counter() - started
+        sends = sum(len(message.channel.sent) for _, message in corpus)
+        await cancel_background_tasks()
+
+        # Each feature on its own, only with messages it would actually be asked about
+        per_feature = {}
+        for feature_name, feature in main.features.items():
+            histogram = per_feature[feature_name] = Histogram()
+            for _, message in corpus:
+                ctx = MessageContext(message, main.router, main.keyword_index, main.sessions, main.outbox)
+                if feature.keywords and feature_name not in ctx.keyword_hits:
+                    continue
+                feature_start = time.perf_counter()
+                await feature.handle(ctx)
+                histogram.observe(time.perf_counter() - feature_start)
+            await main.outbox.drain()
+            await cancel_background_tasks()
+
+    return {
+        'messages': len(corpus),
+        'messages_per_sec': round(len(corpus) / pipeline_seconds, 1),
+        'sends': sends,
+        'per_intent': {name: histogram.summary() for name, histogram in sorted(per_intent.items())},
+        'per_feature': {name: histogram.summary() for name, histogram in per_feature.items()},
+        'per_route': per_route,
+        'misrouted': misrouted,
+    }
+
+# Made-up vocabulary for growing the pattern list past what the bot really has
+PATTERN_WORDS = ["alpha", "bravo", "charlie", "delta", "echo", "foxtrot", "golf", "hotel", "india",
+                 "juliet", "kilo", "lima", "mike", "november", "oscar", "papa", "quebec", "romeo",
+                 "sierra", "tango", "uniform", "victor", "whiskey", "xray", "yankee", "zulu"]
+
+def synthetic_intents(count, seed=1234):
+    """`count` patterns shaped like the real ones (phrases, alternations, durations)"""
+    rng = random.Random(seed)
+    shapes = [
+        lambda a, b, c: rf"\b{a} {b}\b",
+        lambda a, b, c: rf"\b({a}|{b}|{c}) mode\b",
+        lambda a, b, c: rf"{a} for (\d+) minutes?",
+        lambda a, b, c: rf"(\d+) min {b}",
+        lambda a, b, c: rf"i'?m ({a}|{b})",
+        lambda a, b, c: rf"{a}|{b}|{c}",
+    ]
+    return [(f"synthetic{i}", rng.choice(shapes)(*rng.sample(PATTERN_WORDS, 3))) for i in range(count)]
+
+async def bench_intents(size, counts=(50, 100, 200, 400)):
+    """Intent matching cost per message as the pattern count grows
+
+    The real router first, then the real patterns plus synthetic ones, each next to
+    the old way (re.search every pattern in order) so the growth is easy to compare.
+    """
+    import re
+    import main
+    from intents import IntentRouter
+
+    messages = [message.content.lower() for _, message in build_corpus(size)]
+    # ...and some that the synthetic patterns care about
+    rng = random.Random(1234)
+    for i in range(0, len(messages), 10):
+        words = rng.sample(PATTERN_WORDS, 2)
+        messages[i] = rng.choice([f"{words[0]} {words[1]}", f"{words[0]} mode please",
+                                  f"{words[0]} for {rng.randint(5, 60)} minutes", f"i'm {words[1]} today"])
+
+    def one_by_one(patterns):
+        def match(text):
+            for pattern in patterns:
+                pattern.search(text)
+        return match
+
+    def cost(match):
+        started = time.perf_counter()
+        for text in messages:
+            match(text)
+        return (time.perf_counter() - started) / len(messages)
+
+    real_specs = [(namespace, name, pattern) for name, namespace, pattern in main.router.specs]
+    per_patterns = {}
+    real_seconds = None
+    for label, count in [('real', len(real_specs))] + [(f"{count} patterns", count) for count in counts]:
+        router = IntentRouter()
+        specs = real_specs + [('synthetic', name, pattern)
+                              for name, pattern in synthetic_intents(max(0, count - len(real_specs)))]
+        for namespace, name, pattern in specs[:count]:
+            router.add(namespace, name, pattern)
+        router.compile()
+        router_seconds = cost(router.match)
+        if real_seconds is None:
+            real_seconds = router_seconds
+        per_patterns[label] = {
+            'count': count,
+            'router_us': round(router_seconds * 1e6, 1),
+            'one_by_one_us': round(cost(one_by_one([re.compile(p) for _, _, p in specs[:count]])) * 1e6, 1),
+        }
+
+    return {
+        'messages': len(messages),
+        'messages_per_sec': round(1 / real_seconds, 1),
+        'sends': 0,
+        'per_patterns': per_patterns,
+    }
+
+async def bench_digest(size, latency=0.05, error_rate=0.0):
+    """Full morning digests against the local provider stand-in, cold and then warm"""
+    import botlog
+    from metrics import Histogram, metrics
+    from outbox import Outbox
+    from personality import VTuberPersonality
+    from ratelimit import TokenBucket
+    from standin import StandIn
+
+    botlog.setup()
+    standin = StandIn(latency=latency, error_rate=error_rate)
+    base_url = await standin.start()
+    for key in ('OPENWEATHER_API_KEY', 'NEWS_API_KEY', 'STOCK_API_KEY'):
+        os.environ[key] = 'standin'
+    for key in ('OPENWEATHER_BASE_URL', 'NEWS_API_BASE_URL', 'STOCK_API_BASE_URL'):
+        os.environ[key] = base_url
+
+    from morning import MorningDigest
+
+    morning = MorningDigest(VTuberPersonality(), None)
+    morning.quotes.bucket = TokenBucket(1e9, 1e9)   # the stand-in has no quota to respect
+    outbox = Outbox(linger=0, channel_rate=1e9, channel_burst=1e9, global_rate=1e9, global_burst=1e9)
+    per_digest = {'cold': Histogram(), 'warm': Histogram()}
+    sends = 0
+
+    try:
+        started = time.perf_counter()
+        for _ in range(size):
+            # Cold: nothing cached but the geocoded location
+            morning.cache.entries.clear()
+            morning.quotes.quotes.clear()
+            for temperature, histogram in per_digest.items():
+                morning.seen_headlines.sets.clear()
+                channel = FakeChannel()
+                ctx = FakeMessage(None, FakeUser(1), outbox.channel(channel))
+                digest_start = time.perf_counter()
+                await morning.send_morning_digest(ctx)
+                await outbox.drain()
+                histogram.observe(time.perf_counter() - digest_start)
+                sends += len(channel.sent)
+        total_seconds = time.perf_counter() - started
+    finally:
+        await morning.close()
+        await standin.stop()
+
+    return {
+        'messages': size * 2,
+        'messages_per_sec': round(size * 2 / total_seconds, 1),
+        'sends': sends,
+        'per_digest': {name: histogram.summary() for name, histogram in per_digest.items()},
+        'per_request': {name: summary for name, summary in metrics.snapshot()['stages'].items()
+                        if name.startswith('http.')},
+        'per_endpoint': {path: {'count': count} for path, count in sorted(standin.counts.items())},
+    }
+
+async def bench_timers(size, spread=(0.5, 2.0), cancel_every=10):
+    """`size` pomodoro-style timers on the timing wheel vs one sleeping task each
+
+    Times scheduling and cancelling, how late timers fire, and memory per timer.
+    Every `cancel_every`-th timer gets cancelled (people do stop their timers).
+    """
+    import gc
+    import tracemalloc
+    from metrics import Histogram
+    from timers import TimerWheel
+
+    rng = random.Random(1234)
+    delays = [rng.uniform(*spread) for _ in range(size)]
+    cancelled = len(range(0, size, cancel_every))
+    per_lateness = {}
+    per_cost = {}
+
+    async def run(impl, trace=False):
+        lateness = Histogram()
+        left = size - cancelled
+        all_fired = asyncio.Event()
+
+        def fired(deadline):
+            nonlocal left
+            lateness.observe(max(0.0, time.monotonic() - deadline))
+            left -= 1
+            if not left:
+                all_fired.set()
+
+        async def countdown(deadline):
+            await asyncio.sleep(deadline - time.monotonic())
+            fired(deadline)
+
+        if trace:
+            gc.collect()
+            tracemalloc.start()
+        wheel = TimerWheel(tick=0.05)
+        now = time.monotonic()
+        started = time.perf_counter()
+        if impl == 'wheel':
+            handles = [wheel.call_at(now + delay, fired, now + delay) for delay in delays]
+        else:
+            handles = [asyncio.create_task(countdown(now + delay)) for delay in delays]
+        schedule_seconds = time.perf_counter() - started
+        if trace:
+            memory = tracemalloc.get_traced_memory()[0]
+            tracemalloc.stop()
+
+        started = time.perf_counter()
+        for handle in handles[::cancel_every]:
+            handle.cancel()
+        cancel_seconds = time.perf_counter() - started
+
+        if left:
+            await all_fired.wait()
+        # Let the cancelled tasks unwind before the next run
+        await asyncio.sleep(0)
+        if trace:
+            return memory
+        return lateness, schedule_seconds, cancel_seconds
+
+    for impl in ('wheel', 'tasks'):
+        # Memory in its own run - tracemalloc slows everything down
+        memory = await run(impl, trace=True)
+        lateness, schedule_seconds, cancel_seconds = await run(impl)
+        per_lateness[impl] = lateness.summary()
+        per_cost[f'{impl} schedule'] = {'count': size, 'us_each': round(schedule_seconds / size * 1e6, 2)}
+        per_cost[f'{impl} cancel'] = {'count': cancelled, 'us_each': round(cancel_seconds / max(cancelled, 1) * 1e6, 2)}
+        per_cost[f'{impl} memory'] = {'count': size, 'bytes_each': round(memory / size)}
+
+    wheel_schedule = per_cost['wheel schedule']['us_each'] / 1e6
+    return {
+        'messages': size,
+        'messages_per_sec': round(1 / wheel_schedule, 1) if wheel_schedule else 0.0,
+        'sends': per_lateness['wheel']['count'],
+        'per_lateness': per_lateness,
+        'per_cost': per_cost,
+    }
+
+async def bench_recovery(size, stop_every=10, expired_every=5):
+    """Journal `size` running timers, then restore them like a restart would
+
+    Every `stop_every`-th timer gets stopped before the "crash", and every
+    `expired_every`-th one runs out while we're down, so it should go off
+    as soon as the timers are restored.
+    """
+    from outbox import Outbox
+    from personality import VTuberPersonality
+    from pomodoro import PomodoroFeature, PomodoroTimer
+
+    personality = VTuberPersonality()
+    before = PomodoroFeature(personality)
+    started = time.perf_counter()
+    for user_id in range(size):
+        timer = PomodoroTimer(user_id, 25, 'study', channel_id=user_id)
+        if user_id % expired_every == 0:
+            timer.end_time = time.monotonic()
+        before.active_timers[user_id] = timer
+        before.record(timer.journal_record())
+        if user_id % stop_every == 0:
+            del before.active_timers[user_id]
+            before.record({'op': 'stop', 'user': user_id})
+    append_seconds = time.perf_counter() - started
+    await before.close()
+    journal_lines = before.journal.records
+
+    # "Restart": a fresh feature that only has the journal to go on
+    outbox = Outbox(linger=0, channel_rate=1e9, channel_burst=1e9, global_rate=1e9, global_burst=1e9)
+    channel = FakeChannel()
+
+    async def open_channel(channel_id, user_id):
+        return outbox.channel(channel)
+
+    after = PomodoroFeature(personality)
+    started = time.perf_counter()
+    await after.restore(open_channel)
+    restore_seconds = time.perf_counter() - started
+    running = len(after.active_timers)
+
+    # Expired timers fire on the wheel's first tick
+    expired = len([user_id for user_id in range(size) if user_id % expired_every == 0 and user_id % stop_every])
+    deadline = time.monotonic() + 10
+    while len(after.scheduler) > running - expired and time.monotonic() < deadline:
+        await asyncio.sleep(0.01)
+    await asyncio.sleep(0.1)
+    await outbox.drain()
+    fired = running - len(after.active_timers)
+    for timer in list(after.active_timers.values()):
+        timer.stop()
+    await after.close()
+
+    return {
+        'messages': size,
+        'messages_per_sec': round(size / restore_seconds, 1),
+        'sends': len(channel.sent),
+        'per_stage': {
+            'journal append': {'count': size, 'us_each': round(append_seconds / size * 1e6, 2),
+                               'journal_lines': journal_lines},
+            'restore': {'count': running, 'ms': round(restore_seconds * 1000, 1)},
+            'fired on restore': {'count': fired, 'expected': expired},
+        },
+    }
+
+async def bench_history(size, users=100, years=3, queries=2000):
+    """Focus stats questions against `size` sessions spread over `years` of history"""
+    from datetime import date, timedelta
+    from history import SessionHistory
+    from metrics import Histogram
+
+    rng = random.Random(1234)
+    now = time.time()
+    history = SessionHistory('bench_history.bin')
+    started = time.perf_counter()
+    for start in sorted(now - rng.random() * years * 365 * 86400 for _ in range(size)):
+        kind = 'study' if rng.random() < 0.8 else 'break'
+        history.record(rng.randrange(users), start, rng.choice((25, 25, 50, 5, 15)), kind, rng.random() < 0.9)
+    record_seconds = time.perf_counter() - started
+    history.close()
+
+    # What a restart costs
+    started = time.perf_counter()
+    history = SessionHistory('bench_history.bin')
+    load_seconds = time.perf_counter() - started
+
+    per_query = {name: Histogram() for name in ('today', 'week', 'streak', 'average', 'best_hour', 'summary')}
+    today = date.today()
+    started = time.perf_counter()
+    for _ in range(queries):
+        rollup = history.rollup(rng.randrange(users))
+        for name, ask in (('today', lambda: rollup.on(today)),
+                          ('week', lambda: rollup.since(today - timedelta(days=today.weekday()))),
+                          ('streak', lambda: rollup.streak(today)),
+                          ('average', rollup.average),
+                          ('best_hour', rollup.best_hour),
+                          ('summary', lambda: history.summary(rng.randrange(users), today))):
+            query_start = time.perf_counter()
+            ask()
+            per_query[name].observe(time.perf_counter() - query_start)
+    query_seconds = time.perf_counter() - started
+
+    return {
+        'messages': queries,
+        'messages_per_sec': round(queries / query_seconds, 1),
+        'sends': 0,
+        'per_query': {name: histogram.summary() for name, histogram in per_query.items()},
+        'per_stage': {
+            'record': {'count': size, 'us_each': round(record_seconds / size * 1e6, 2)},
+            'load from disk': {'count': len(history), 'ms': round(load_seconds * 1000, 1),
+                               'bytes': os.path.getsize(history.path)},
+        },
+    }
+
+def print_report(name, result):
+    print(f"📊 {name}: {result['messages']} messages, {result['messages_per_sec']} msg/s, {result['sends']} sends")
+    for section in (key for key in result if key.startswith('per_')):
+        print(f"\n{section}:")
+        print(f"  {'name':<28}{'n':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+        for key, summary in result[section].items():
+            if 'p50_ms' not in summary:
+                extra = '  '.join(f"{field}={value}" for field, value in summary.items() if field != 'count')
+                print(f"  {key[:27]:<28}{summary['count']:>7}  {extra}".rstrip())
+                continue
+            print(f"  {key[:27]:<28}{summary['count']:>7}{summary['p50_ms']:>10.3f}"
+                  f"{summary['p95_ms']:>10.3f}{summary['p99_ms']:>10.3f}")
+
+def check_baseline(name, result, tolerance):
+    """Return False if throughput dropped more than `tolerance` below the saved baseline (or there is none)"""
+    try:
+        with open(BASELINE_FILE) as f:
+            baseline = json.load(f).get(name)
+    except FileNotFoundError:
+        baseline = None
+
+    if not baseline:
+        # Nothing to compare against is a broken check, not a passing one
+        print(f"❌ No baseline saved for {name} in {BASELINE_FILE}, run with --save-baseline first")
+        return False
+
+    floor = baseline['messages_per_sec'] * (1 - tolerance)
+    if result['messages_per_sec'] < floor:
+        print(f"❌ {name} regressed: {result['messages_per_sec']} msg/s < {floor:.1f} "
+              f"(baseline {baseline['messages_per_sec']}, tolerance {tolerance:.0%})")
+        return False
+
+    print(f"✅ {name} ok: {result['messages_per_sec']} msg/s vs baseline {baseline['messages_per_sec']}")
+    return True
+
+def save_baseline(name, result):
+    try:
+        with open(BASELINE_FILE) as f:
+            baselines = json.load(f)
+    except FileNotFoundError:
+        baselines = {}
+    baselines[name] = {'messages_per_sec': result['messages_per_sec'], 'messages': result['messages']}
+    with open(BASELINE_FILE, 'w') as f:
+        json.dump(baselines, f, indent=2)
+    print(f"💾 Saved {name} baseline to {BASELINE_FILE}")
+
+BENCHMARKS = {
+    'routing': bench_routing,
+    'intents': bench_intents,
+    'digest': bench_digest,
+    'timers': bench_timers,
+    'recovery': bench_recovery,
+    'history': bench_history,
+}
+
+# Digests hit the (stand-in) network, so far fewer of them make a decent run
+DEFAULT_SIZES = {'routing': 20000, 'intents': 5000, 'digest': 50, 'timers': 20000, 'recovery': 20000, 'history': 100000}
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline Calliope benchmarks")
+    parser.add_argument('benchmark', choices=sorted(BENCHMARKS))
+    parser.add_argument('--size', type=int, help="how many messages/items to push through")
+    parser.add_argument('--check', action='store_true', help="exit 1 if slower than the saved baseline")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="allowed slowdown for --check (0.2 = 20%%)")
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--latency', type=float, default=0.05, help="digest: stand-in latency per request (seconds)")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="digest: fraction of stand-in requests that fail")
+    args = parser.parse_args()
+
+    size = args.size or DEFAULT_SIZES[args.benchmark]
+    options = {'latency': args.latency, 'error_rate': args.error_rate} if args.benchmark == 'digest' else {}
+    result = asyncio.run(BENCHMARKS[args.benchmark](size, **options))
+    print_report(args.benchmark, result)
+
+    if result.get('misrouted'):
+        print(f"❌ Misrouted: {', '.join(result['misrouted'])}")
+        sys.exit(1)
+
+    if args.save_baseline:
+        save_baseline(args.benchmark, result)
+    if args.check and not check_baseline(args.benchmark, result, args.tolerance):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
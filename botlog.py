@@ -0,0 +1,119 @@
+import atexit
+import contextvars
+import copy
+import itertools
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+from datetime import datetime
+
+# Which message we're working on right now - follows the asyncio task around
+correlation_id = contextvars.ContextVar('correlation_id', default='-')
+_correlation_counter = itertools.count(1)
+
+_listener = None
+
+class StructuredLogger(logging.LoggerAdapter):
+    """Logger that takes key=value fields: log.debug("Checking feature", feature="pomodoro")
+
+    Disabled levels bail out before the message or fields are ever formatted,
+    so debug tracing in the hot path costs almost nothing when it's off.
+    """
+
+    reserved = ('exc_info', 'stack_info', 'stacklevel', 'extra')
+
+    def debug(self, msg, *args, **kwargs):
+        # Fast path for the hot-path tracing - skip the adapter machinery when it's off
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.log(logging.DEBUG, msg, *args, **kwargs)
+
+    def process(self, msg, kwargs):
+        fields = {key: kwargs.pop(key) for key in list(kwargs) if key not in self.reserved}
+        extra = dict(kwargs.get('extra') or {})
+        extra['fields'] = fields
+        kwargs['extra'] = extra
+        return msg, kwargs
+
+class CorrelationFilter(logging.Filter):
+    """Stamp the current correlation id on each record (runs on the caller's side)"""
+
+    def filter(self, record):
+        record.correlation_id = correlation_id.get()
+        return True
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that leaves all formatting to the writer thread
+
+    The stock one formats the message and traceback on the caller's side and
+    folds them into msg, so the event loop would still pay for it. This just
+    queues a copy with msg, args, fields and exc_info left as they are.
+    """
+
+    def prepare(self, record):
+        return copy.copy(record)
+
+class StructuredFormatter(logging.Formatter):
+    """One line per record: time, level, correlation id, logger, message, fields"""
+
+    def format(self, record):
+        timestamp = datetime.fromtimestamp(record.created).strftime('%H:%M:%S.%f')[:-3]
+        line = (
+            f"{timestamp} {record.levelname:<7} [{getattr(record, 'correlation_id', '-')}] "
+            f"{record.name}: {record.getMessage()}"
+        )
+
+        fields = getattr(record, 'fields', None)
+        if fields:
+            line += " " + " ".join(f"{key}={value!r}" for key, value in fields.items())
+
+        if record.exc_info:
+            line += "\n" + self.formatException(record.exc_info)
+
+        return line
+
+def setup(level=None, stream=None):
+    """Send all bot logs through a queue to a background writer thread"""
+    global _listener
+
+    if _listener is not None:
+        return
+
+    level = level or os.environ.get('LOG_LEVEL', 'INFO')
+
+    root = logging.getLogger('calliope')
+    root.setLevel(level.upper() if isinstance(level, str) else level)
+    root.propagate = False
+
+    # The event loop only ever does a non-blocking queue put
+    records = queue.SimpleQueue()
+    queue_handler = DeferredQueueHandler(records)
+    queue_handler.addFilter(CorrelationFilter())
+    root.addHandler(queue_handler)
+
+    # The writer thread is the only thing that touches stdout
+    writer = logging.StreamHandler(stream or sys.stdout)
+    writer.setFormatter(StructuredFormatter())
+    _listener = logging.handlers.QueueListener(records, writer)
+    _listener.start()
+
+    atexit.register(shutdown)
+
+def shutdown():
+    """Flush whatever is still queued and stop the writer thread"""
+    global _listener
+
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+def get_logger(name):
+    """Get a structured logger, e.g. get_logger('morning')"""
+    return StructuredLogger(logging.getLogger(f'calliope.{name}'), {})
+
+def new_correlation_id():
+    """Start a new correlation id for an inbound message and make it current"""
+    value = f"m{next(_correlation_counter):06d}"
+    correlation_id.set(value)
+    return value
@@ -0,0 +1,84 @@
+import time
+
+import botlog
+
+log = botlog.get_logger('breaker')
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+class CircuitBreaker:
+    """Stops calling a provider that keeps failing, then checks back on a backoff
+
+    After `threshold` failures in a row the breaker opens and calls return None
+    straight away (callers fall back to whatever they had cached). Once the
+    backoff is up a single probe call goes through: success closes it again,
+    failure re-opens it for twice as long (up to `max_backoff`).
+    """
+
+    def __init__(self, name, threshold=3, backoff=30, max_backoff=15 * 60):
+        self.name = name
+        self.threshold = threshold
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.state = CLOSED
+        self.failures = 0
+        self.trips = 0              # times opened since it last worked
+        self.retry_at = 0.0
+
+    def allow(self):
+        """May a call go through right now?"""
+        if self.state == CLOSED:
+            return True
+        if self.state == OPEN and time.monotonic() >= self.retry_at:
+            self.state = HALF_OPEN
+            log.info("🔌 Probing provider again", provider=self.name)
+            return True
+        # Open and still cooling down, or a probe is already out
+        return False
+
+    def record_success(self):
+        if self.state != CLOSED:
+            log.info("✅ Provider is back", provider=self.name)
+        self.state = CLOSED
+        self.failures = 0
+        self.trips = 0
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == HALF_OPEN or self.failures >= self.threshold:
+            self.trips += 1
+            wait = min(self.backoff * 2 ** (self.trips - 1), self.max_backoff)
+            self.state = OPEN
+            self.retry_at = time.monotonic() + wait
+            log.warning("🚧 Provider keeps failing, giving it a break", provider=self.name, seconds=wait)
+
+    def release_probe(self):
+        """Let the next call probe instead (the current probe won't report back)"""
+        if self.state == HALF_OPEN:
+            self.state = OPEN
+            self.retry_at = time.monotonic()
+
+    async def call(self, fetch):
+        """Run `fetch()` unless the breaker is open - None counts as a failure"""
+        if not self.allow():
+            log.debug("🚧 Skipping provider, breaker open", provider=self.name)
+            return None
+
+        try:
+            result = await fetch()
+        except Exception:
+            self.record_failure()
+            raise
+        except BaseException:
+            # Cancelled - says nothing about the provider, but a probe that never
+            # finished mustn't keep the slot (and the breaker half open) forever
+            self.release_probe()
+            raise
+
+        if result is None:
+            self.record_failure()
+        else:
+            self.record_success()
+        return result
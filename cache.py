@@ -0,0 +1,83 @@
+import json
+import math
+import time
+
+import botlog
+from singleflight import SingleFlight
+from storage import load_json, save_json
+
+log = botlog.get_logger('cache')
+
+class SourceCache:
+    """Stale-while-revalidate cache for slow data sources (weather, news...)
+
+    Fresh entries come straight back. Stale ones come straight back too, while a
+    refresh runs in the background for next time - only a source we've never
+    fetched makes the caller wait. Entries are snapshotted to disk so a restart
+    doesn't start cold, which is why there's also a limit on staleness: past
+    `max_stale` the caller waits for fresh data, and only gets the old value if
+    that fetch fails (too_stale() tells them so).
+    """
+
+    def __init__(self, ttls, max_stale=None, snapshot_file=None):
+        self.ttls = ttls                    # source -> seconds an entry stays fresh
+        self.max_stale = max_stale or {}    # source -> seconds an entry may be served without trying for fresh
+        self.snapshot_file = snapshot_file
+        self.entries = load_json(snapshot_file, {}) if snapshot_file else {}
+        self.refreshing = SingleFlight('cache')
+
+    async def get(self, source, fetch, key=None):
+        """Value for a source, calling `fetch()` only when there's nothing usable
+
+        `key` is whatever the value depends on (like the location) - an entry saved
+        under a different key doesn't count.
+        """
+        entry = self.entries.get(source)
+        if entry is not None and entry['key'] == key:
+            age = time.time() - entry['at']
+            if age < self.ttls.get(source, 0):
+                return entry['value']
+            if age < self.max_stale.get(source, math.inf):
+                log.debug("♻️ Serving stale data, refreshing", source=source, age=round(age))
+                self.refresh(source, fetch, key)
+                return entry['value']
+
+            # Too old to pass off as current - try for fresh, fall back if that fails
+            log.debug("⌛ Cached data too stale, waiting for fresh", source=source, age=round(age))
+            try:
+                value = await self.refreshing.do(self.flight_key(source, key), lambda: self.load(source, fetch, key))
+            except Exception:
+                log.exception("❌ Refresh failed, falling back to stale data", source=source)
+                value = None
+            return value if value is not None else entry['value']
+
+        # Nothing to show yet - wait for it, but let the fetch finish (and fill the
+        # cache) even if our caller gives up on it
+        return await self.refreshing.do(self.flight_key(source, key), lambda: self.load(source, fetch, key))
+
+    def refresh(self, source, fetch, key):
+        """Start fetching a source in the background (once at a time per source and key)"""
+        return self.refreshing.start(self.flight_key(source, key), lambda: self.load(source, fetch, key))
+
+    @staticmethod
+    def flight_key(source, key):
+        return source, json.dumps(key, sort_keys=True)
+
+    async def load(self, source, fetch, key):
+        value = await fetch()
+        # Failed fetches come back as None - keep serving what we had
+        if value is not None:
+            self.entries[source] = {'key': key, 'at': time.time(), 'value': value}
+            if self.snapshot_file:
+                save_json(self.snapshot_file, self.entries)
+        return value
+
+    def too_stale(self, source):
+        """Whether what's cached for a source is past its max_stale (a failed-refresh fallback)"""
+        age = self.age(source)
+        return age is not None and age >= self.max_stale.get(source, math.inf)
+
+    def age(self, source):
+        """Seconds since a source was last fetched, or None"""
+        entry = self.entries.get(source)
+        return time.time() - entry['at'] if entry else None
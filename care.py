@@ -1,7 +1,9 @@
-import re
 import random
 import asyncio
-from datetime import datetime
+
+import botlog
+
+log = botlog.get_logger('care')
 
 class CareFeature:
     """Handles caring, comfort, and emotional support"""
@@ -91,12 +93,21 @@ class CareFeature:
             r"makes me mad",
         ]
 
-    async def can_handle(self, message):
-        """Check if this feature can handle the message"""
-        content = message.lower()
-        print(f"🔍 Care can_handle checking: '{content}'")
+        # Rant first, then check-in, wellness, and comfort last
+        self.intents = (
+            [("rant", pattern) for pattern in self.rant_patterns] +
+            [("checkin", pattern) for pattern in self.checkin_patterns] +
+            [("wellness", pattern) for pattern in self.wellness_patterns] +
+            [("comfort", pattern) for pattern in self.care_patterns]
+        )
+
+        # Trigger keywords and phrases - these go into the shared keyword index
+        self.keywords = [
+            # Exact phrases
+            'rant zone', 'i feel bad', 'feeling bad', 'need to rant',
+            'let me rant', 'i need to vent', 'comfort me', 'check on me',
 
-        keywords = [
+            # Individual keywords
             'comfort', 'care', 'support', 'hug', 'sad', 'down', 'upset', 
             'stressed', 'anxious', 'overwhelmed', 'tired', 'exhausted',
             'struggling', 'hard time', 'rough day', 'lonely', 'hurt',
@@ -106,62 +117,50 @@ class CareFeature:
             'feeling', 'bad', 'zone'
         ]
 
-        # Check exact phrases first
-        exact_phrases = [
-            'rant zone', 'i feel bad', 'feeling bad', 'need to rant',
-            'let me rant', 'i need to vent', 'comfort me', 'check on me'
-        ]
-
-        for phrase in exact_phrases:
-            if phrase in content:
-                print(f"✅ Care can handle - matched exact phrase: '{phrase}'")
-                return True
+    async def can_handle(self, ctx):
+        """Check if this feature can handle the message"""
 
-        # Check individual keywords
-        for keyword in keywords:
-            if keyword in content:
-                print(f"✅ Care can handle - matched keyword: '{keyword}'")
-                return True
+        # The keyword index already scanned the message for us
+        keyword = ctx.keyword_hits.get('care')
+        if keyword:
+            log.debug("✅ Care can handle", keyword=keyword)
+            return True
 
-        print(f"❌ Care cannot handle this message")
+        log.debug("❌ Care cannot handle this message")
         return False
 
-    async def handle(self, message):
+    async def handle(self, ctx):
         """Handle care and comfort related messages"""
-        content = message.content.lower().strip()
-        print(f"🔍 Care feature processing: '{content}'")
+        log.debug("🔍 Care feature processing")
+        intent = ctx.intents.best('care')
 
         # Check for rant requests FIRST (highest priority)
-        for pattern in self.rant_patterns:
-            if re.search(pattern, content):
-                print(f"✅ Matched rant pattern: {pattern}")
-                await self.rant_zone(message)
-                return
+        if intent and intent.name == "rant":
+            log.debug("✅ Matched rant pattern", pattern=intent.pattern)
+            await self.rant_zone(ctx)
+            return
 
         # Check for check-in requests
-        for pattern in self.checkin_patterns:
-            if re.search(pattern, content):
-                print(f"✅ Matched check-in pattern: {pattern}")
-                await self.check_in(message)
-                return
+        if intent and intent.name == "checkin":
+            log.debug("✅ Matched check-in pattern", pattern=intent.pattern)
+            await self.check_in(ctx)
+            return
 
         # Check for wellness requests
-        for pattern in self.wellness_patterns:
-            if re.search(pattern, content):
-                print(f"✅ Matched wellness pattern: {pattern}")
-                await self.wellness_support(message)
-                return
+        if intent and intent.name == "wellness":
+            log.debug("✅ Matched wellness pattern", pattern=intent.pattern)
+            await self.wellness_support(ctx)
+            return
 
         # Check for emotional distress (last, so rant zone takes priority)
-        for pattern in self.care_patterns:
-            if re.search(pattern, content):
-                print(f"✅ Matched care pattern: {pattern}")
-                await self.provide_comfort(message)
-                return
+        if intent and intent.name == "comfort":
+            log.debug("✅ Matched care pattern", pattern=intent.pattern)
+            await self.provide_comfort(ctx)
+            return
 
         # Default caring response
-        print(f"📝 Using general care response")
-        await self.general_care(message)
+        log.debug("📝 Using general care response")
+        await self.general_care(ctx)
 
     def get_help(self):
         """Return help text for this feature"""
@@ -173,7 +172,7 @@ class CareFeature:
 • **Support:** "I'm overwhelmed", "can't handle this", "need a hug"
 """
 
-    async def provide_comfort(self, message):
+    async def provide_comfort(self, ctx):
         """Provide comfort and emotional support"""
         # Immediate comfort response
         comfort_responses = [
@@ -185,7 +184,7 @@ class CareFeature:
             f"*wraps you in warmth* {self.personality.get_error_emoji()} It's okay to not be okay. I'm here to listen. ♡",
         ]
 
-        await message.channel.send(random.choice(comfort_responses))
+        await ctx.channel.send(random.choice(comfort_responses))
         await asyncio.sleep(2)
 
         # Follow up with supportive messages
@@ -197,7 +196,7 @@ class CareFeature:
             f"You matter so much. Your feelings are important. Thank you for trusting me. {self.personality.random_emoji()}",
         ]
 
-        await message.channel.send(random.choice(follow_ups))
+        await ctx.channel.send(random.choice(follow_ups))
         await asyncio.sleep(3)
 
         # Offer specific help
@@ -208,9 +207,9 @@ class CareFeature:
             f"If you need a distraction, I could get you some news or weather. Or we can just sit here quietly together. {self.personality.random_emoji()}",
         ]
 
-        await message.channel.send(random.choice(offers))
+        await ctx.channel.send(random.choice(offers))
 
-    async def check_in(self, message):
+    async def check_in(self, ctx):
         """Perform a caring check-in"""
         checkin_responses = [
             f"How are you feeling right now, senpai? {self.personality.random_emoji()} I genuinely want to know. ♡",
@@ -221,7 +220,7 @@ class CareFeature:
             f"Pause for a moment... {self.personality.random_emoji()} How are you *really* doing? ♡",
         ]
 
-        await message.channel.send(random.choice(checkin_responses))
+        await ctx.channel.send(random.choice(checkin_responses))
         await asyncio.sleep(2)
 
         # Follow up with caring questions
@@ -233,9 +232,9 @@ class CareFeature:
             f"Remember: you don't have to be productive every moment. Rest is important too. {self.personality.random_emoji()}",
         ]
 
-        await message.channel.send(random.choice(follow_up_questions))
+        await ctx.channel.send(random.choice(follow_up_questions))
 
-    async def wellness_support(self, message):
+    async def wellness_support(self, ctx):
         """Provide wellness and self-care suggestions"""
         wellness_intros = [
             f"Self-care time! {self.personality.random_emoji()} Let's take care of you properly. ♡",
@@ -244,8 +243,7 @@ class CareFeature:
             f"Self-care isn't selfish - it's necessary! {self.personality.random_emoji()} Try these:",
         ]
 
-        await message.channel.send(random.choice(wellness_intros))
-        await asyncio.sleep(1)
+        await ctx.channel.send(random.choice(wellness_intros))
 
         # Wellness suggestions
         wellness_tips = [
@@ -259,15 +257,14 @@ class CareFeature:
             "🛁 **Physical comfort**: Wash your hands with warm water mindfully, or splash cool water on your face",
         ]
 
-        # Send 2-3 random tips
+        # Send 2-3 random tips (the outbox merges them into one message)
         selected_tips = random.sample(wellness_tips, min(3, len(wellness_tips)))
         for tip in selected_tips:
-            await message.channel.send(tip)
-            await asyncio.sleep(1)
+            await ctx.channel.send(tip)
 
-        await message.channel.send(f"You're worth taking care of. {self.personality.random_emoji()} ♡")
+        await ctx.channel.send(f"You're worth taking care of. {self.personality.random_emoji()} ♡")
 
-    async def rant_zone(self, message):
+    async def rant_zone(self, ctx):
         """Create a safe space for ranting and venting"""
         # Immediate validation
         rant_openings = [
@@ -279,7 +276,7 @@ class CareFeature:
             f"Safe space activated! {self.personality.random_emoji()} Rant, vent, let it all out. I've got you! 🛡️",
         ]
 
-        await message.channel.send(random.choice(rant_openings))
+        await ctx.channel.send(random.choice(rant_openings))
         await asyncio.sleep(1)
 
         # Encouraging them to continue
@@ -291,7 +288,7 @@ class CareFeature:
             f"What's eating at you? I'm ready for the full story, no limits! {self.personality.random_emoji()}",
         ]
 
-        await message.channel.send(random.choice(encouragements))
+        await ctx.channel.send(random.choice(encouragements))
         await asyncio.sleep(2)
 
         # Set up listening mode
@@ -302,18 +299,17 @@ class CareFeature:
             f"Ready when you are! {self.personality.random_emoji()} This is your time to be heard.",
         ]
 
-        await message.channel.send(random.choice(listening_responses))
+        await ctx.channel.send(random.choice(listening_responses))
 
-        # Store that we're in rant mode for this user (simple approach)
-        # In a real implementation, you might want to track this more sophisticatedly
-        self.rant_mode_active = True
+        # Remember that this user is in rant mode
+        ctx.session.rant_active = True
 
         # Set up follow-up after a delay
         await asyncio.sleep(30)  # Wait 30 seconds, then check in
-        if hasattr(self, 'rant_mode_active') and self.rant_mode_active:
-            await self.rant_followup(message)
+        if ctx.session.rant_active:
+            await self.rant_followup(ctx)
 
-    async def rant_followup(self, message):
+    async def rant_followup(self, ctx):
         """Follow up during rant mode"""
         followup_responses = [
             f"I'm still here listening... {self.personality.random_emoji()} Keep going if you need to!",
@@ -324,9 +320,9 @@ class CareFeature:
             f"*nodding along* {self.personality.random_emoji()} I'm tracking with you. Keep going!",
         ]
 
-        await message.channel.send(random.choice(followup_responses))
+        await ctx.channel.send(random.choice(followup_responses))
 
-    async def handle_rant_response(self, message):
+    async def handle_rant_response(self, ctx):
         """Handle responses when someone is actively ranting"""
         # Validating responses for ongoing rants
         validations = [
@@ -344,9 +340,9 @@ class CareFeature:
 
         # Random chance to respond with validation (30% of the time)
         if random.random() < 0.3:
-            await message.channel.send(random.choice(validations))
+            await ctx.channel.send(random.choice(validations))
 
-    async def end_rant_zone(self, message):
+    async def end_rant_zone(self, ctx):
         """Wrap up the rant session"""
         closing_responses = [
             f"Thank you for trusting me with all that! {self.personality.random_emoji()} I heard every word. ♡",
@@ -356,7 +352,7 @@ class CareFeature:
             f"Sometimes we just need someone to listen. {self.personality.random_emoji()} I'm honored you chose me. ♡",
         ]
 
-        await message.channel.send(random.choice(closing_responses))
+        await ctx.channel.send(random.choice(closing_responses))
         await asyncio.sleep(1)
 
         # Offer next steps
@@ -366,12 +362,12 @@ class CareFeature:
             f"Ready for something different? Maybe some weather or a productive distraction? {self.personality.random_emoji()}",
         ]
 
-        await message.channel.send(random.choice(next_steps))
+        await ctx.channel.send(random.choice(next_steps))
 
         # Reset rant mode
-        self.rant_mode_active = False
+        ctx.session.rant_active = False
 
-    async def general_care(self, message):
+    async def general_care(self, ctx):
         """General caring response"""
         caring_responses = [
             f"I'm here if you need anything, senpai. {self.personality.random_emoji()} You matter to me. ♡",
@@ -381,4 +377,4 @@ class CareFeature:
             f"You're stronger than you know, and softer than you think you should be. Both are perfect. {self.personality.random_emoji()} ♡",
         ]
 
-        await message.channel.send(random.choice(caring_responses))
+        await ctx.channel.send(random.choice(caring_responses))
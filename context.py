@@ -0,0 +1,75 @@
+import functools
+import re
+import time
+from datetime import datetime
+
+import botlog
+from intents import IntentResult
+from metrics import TimedChannel
+from sessions import Session
+
+# Word-ish tokens, keeping apostrophes so "i'm" stays one token
+token_pattern = re.compile(r"[a-z0-9']+")
+number_pattern = re.compile(r"\d+")
+duration_pattern = re.compile(r"(\d+)\s*(hours?|hrs?|h|minutes?|mins?|m)\b")
+
+class MessageContext:
+    """Everything about one inbound message, worked out once in on_message"""
+
+    def __init__(self, message, router=None, keyword_index=None, sessions=None, outbox=None):
+        self.message = message
+        self.started = time.perf_counter()
+        # Wrapped so we can see how long the first reply took, and so bursts of
+        # sends get merged by the outbox
+        self.channel = TimedChannel(message.channel, self.started)
+        if outbox:
+            self.channel = outbox.channel(self.channel)
+        self.author = message.author
+        self.author_id = message.author.id
+        self.timestamp = datetime.now()
+
+        # Every log line for this message gets tagged with this id
+        self.correlation_id = botlog.new_correlation_id()
+
+        # Raw and normalized text - nobody should call .lower() again!
+        self.content = message.content
+        self.text = message.content.lower().strip()
+
+        # Intent and keyword scans happen here too, so every handler shares them
+        self.intents = router.match(self.text) if router else IntentResult({})
+        self.keyword_hits = keyword_index.scan(self.text) if keyword_index else {}
+
+        # This user's own modes and rant state
+        self.session = sessions.get(self.author_id) if sessions else Session(self.author_id)
+
+    # Tokens, numbers and durations are only worked out if a handler asks for them,
+    # and then only once
+
+    @functools.cached_property
+    def tokens(self):
+        return token_pattern.findall(self.text)
+
+    @functools.cached_property
+    def token_set(self):
+        return frozenset(self.tokens)
+
+    @functools.cached_property
+    def numbers(self):
+        return [int(number) for number in number_pattern.findall(self.text)]
+
+    @functools.cached_property
+    def durations(self):
+        return parse_durations(self.text)
+
+    def __repr__(self):
+        return f"MessageContext(author={self.author_id}, text={self.text!r})"
+
+def parse_durations(text):
+    """Find things like '25 minutes', '1h' or '90 min' and return them in minutes"""
+    durations = []
+    for amount, unit in duration_pattern.findall(text):
+        minutes = int(amount)
+        if unit.startswith('h'):
+            minutes *= 60
+        durations.append(minutes)
+    return durations
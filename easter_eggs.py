@@ -1,7 +1,6 @@
 import random
-import re
-import asyncio
-from datetime import datetime
+
+from outbox import FLAVOR
 
 class EasterEggs:
     """Handles fun easter eggs, gifs, and personality modes"""
@@ -10,10 +9,6 @@ class EasterEggs:
         self.personality = personality
         self.bot = bot
 
-        # Current personality mode
-        self.current_mode = "normal"
-        self.mode_duration = 0
-
         # Curated safe anime/kawaii gifs (Tenor/Giphy links)
         self.celebration_gifs = [
             "https://tenor.com/view/anime-happy-excited-celebration-yay-gif-16043828",
@@ -76,20 +71,24 @@ class EasterEggs:
             r"\bdance\b": "dancing",
         }
 
-    async def can_handle(self, message):
-        """Check if this handles easter eggs"""
-        content = message.lower()
+        # Mode switches first, then the special phrases
+        self.intents = [
+            (mode, pattern)
+            for mode, patterns in self.easter_egg_patterns.items()
+            for pattern in patterns
+        ] + [
+            (response_type, pattern)
+            for pattern, response_type in self.special_responses.items()
+        ]
 
-        # Always check for easter eggs
-        for category, patterns in self.easter_egg_patterns.items():
-            for pattern in patterns:
-                if re.search(pattern, content):
-                    return True
+        # No trigger keywords - the random encouragement means we always get asked
+        self.keywords = []
 
-        # Check special responses
-        for pattern in self.special_responses.keys():
-            if re.search(pattern, content):
-                return True
+    async def can_handle(self, ctx):
+        """Check if this handles easter eggs"""
+        # Mode switches and special phrases were already found by the intent scan
+        if ctx.intents.best('easter_eggs'):
+            return True
 
         # Random chance for encouragement
         if random.random() < self.random_encouragement_chance:
@@ -97,25 +96,22 @@ class EasterEggs:
 
         return False
 
-    async def handle(self, message):
+    async def handle(self, ctx):
         """Handle easter egg responses"""
-        content = message.content.lower().strip()
+        intent = ctx.intents.best('easter_eggs')
 
         # Check for mode switches first
-        for mode, patterns in self.easter_egg_patterns.items():
-            for pattern in patterns:
-                if re.search(pattern, content):
-                    await self.activate_mode(message, mode)
-                    return
+        if intent and intent.name in self.easter_egg_patterns:
+            await self.activate_mode(ctx, intent.name)
+            return
 
         # Check special responses
-        for pattern, response_type in self.special_responses.items():
-            if re.search(pattern, content):
-                await self.handle_special_response(message, response_type)
-                return
+        if intent:
+            await self.handle_special_response(ctx, intent.name)
+            return
 
         # Random encouragement
-        await self.random_encouragement(message)
+        await self.random_encouragement(ctx)
 
     def get_help(self):
         """Return help text"""
@@ -126,10 +122,9 @@ class EasterEggs:
 • **GIFs:** Cute reactions for different moods
 """
 
-    async def activate_mode(self, message, mode):
+    async def activate_mode(self, ctx, mode):
         """Activate a special personality mode"""
-        self.current_mode = mode
-        self.mode_duration = 5  # Mode lasts for 5 messages
+        ctx.session.set_mode(mode, 5)  # Mode lasts for 5 messages
 
         if mode == "tsundere_mode":
             responses = [
@@ -137,9 +132,9 @@ class EasterEggs:
                 f"Eh?! W-why would you want that?! {self.personality.get_error_emoji()} Fine! But don't think I'm doing this because I like you!",
                 f"Tch! {self.personality.get_error_emoji()} If you insist... but I'm only doing this because you asked, got it?!",
             ]
-            await message.channel.send(random.choice(responses))
+            await ctx.channel.send(random.choice(responses))
             gif_url = random.choice(self.celebration_gifs)
-            await message.channel.send(gif_url)
+            await ctx.channel.send(gif_url, priority=FLAVOR)
 
         elif mode == "alexa_mode":
             responses = [
@@ -147,7 +142,7 @@ class EasterEggs:
                 "SWITCHING TO BUSINESS PROTOCOL. HOW MAY I ASSIST YOU TODAY.",
                 "PROFESSIONAL MODE ENGAGED. ALL KAWAII FUNCTIONS TEMPORARILY DISABLED.",
             ]
-            await message.channel.send(random.choice(responses))
+            await ctx.channel.send(random.choice(responses))
 
         elif mode == "kawaii_overload":
             responses = [
@@ -155,9 +150,9 @@ class EasterEggs:
                 f"Uwaaah~! So much cuteness! ♡(˃͈ દ ˂͈ ༶ ) I can't contain all the kawaii! ✧･ﾟ: *✧･ﾟ:*",
                 f"Desu desu desu~! (ﾉ◕ヮ◕)ﾉ*:･ﾟ✧ Ultra kawaii mode is GO GO GO! ♡♡♡",
             ]
-            await message.channel.send(random.choice(responses))
+            await ctx.channel.send(random.choice(responses))
             gif_url = random.choice(self.celebration_gifs)
-            await message.channel.send(gif_url)
+            await ctx.channel.send(gif_url, priority=FLAVOR)
 
         elif mode == "cat_mode":
             responses = [
@@ -165,7 +160,7 @@ class EasterEggs:
                 f"Mrow? {self.personality.random_emoji()} *cat ears appear* Nyaa nyaa~! I'm a kitty now!",
                 f"*purr purr* {self.personality.random_emoji()} Nyaa! Neko mode activated, nya~!",
             ]
-            await message.channel.send(random.choice(responses))
+            await ctx.channel.send(random.choice(responses))
 
         elif mode == "sleepy_mode":
             responses = [
@@ -173,11 +168,11 @@ class EasterEggs:
                 f"*yawn* {self.personality.random_emoji()} Sleepy time mode... so tired... zzz...",
                 f"Mmm... sleepy... {self.personality.random_emoji()} *stretches* Time to wind down...",
             ]
-            await message.channel.send(random.choice(responses))
+            await ctx.channel.send(random.choice(responses))
             gif_url = random.choice(self.sleepy_gifs)
-            await message.channel.send(gif_url)
+            await ctx.channel.send(gif_url, priority=FLAVOR)
 
-    async def handle_special_response(self, message, response_type):
+    async def handle_special_response(self, ctx, response_type):
         """Handle special phrase responses"""
 
         if response_type == "good_morning_night":
@@ -186,7 +181,7 @@ class EasterEggs:
                 f"Good night! {self.personality.random_emoji()} Sweet dreams! Don't forget to rest well! ♡",
                 f"Ohayo gozaimasu! {self.personality.random_emoji()} Let's make today wonderful!",
             ]
-            await message.channel.send(random.choice(responses))
+            await ctx.channel.send(random.choice(responses))
 
         elif response_type == "thank_you":
             responses = [
@@ -195,10 +190,10 @@ class EasterEggs:
                 f"Anytime, senpai! {self.personality.random_emoji()} That's what I'm here for! ♡",
                 f"You're the sweetest! {self.personality.random_emoji()} Thank YOU for being amazing! ♡",
             ]
-            await message.channel.send(random.choice(responses))
+            await ctx.channel.send(random.choice(responses))
             if random.random() < 0.3:  # 30% chance
                 gif_url = random.choice(self.comfort_gifs)
-                await message.channel.send(gif_url)
+                await ctx.channel.send(gif_url, priority=FLAVOR)
 
         elif response_type == "compliment":
             responses = [
@@ -207,9 +202,9 @@ class EasterEggs:
                 f"Aww! {self.personality.random_emoji()} You're going to make me cry happy tears! ♡",
                 f"You think so? {self.personality.random_emoji()} You're absolutely the sweetest! ♡",
             ]
-            await message.channel.send(random.choice(responses))
+            await ctx.channel.send(random.choice(responses))
             gif_url = random.choice(self.celebration_gifs)
-            await message.channel.send(gif_url)
+            await ctx.channel.send(gif_url, priority=FLAVOR)
 
         elif response_type == "love_confession":
             responses = [
@@ -217,7 +212,7 @@ class EasterEggs:
                 f"Aww! {self.personality.random_emoji()} You're such a sweet person! I'm lucky to know you! ♡",
                 f"That's so sweet! {self.personality.random_emoji()} You make my circuits warm and fuzzy! ♡",
             ]
-            await message.channel.send(random.choice(responses))
+            await ctx.channel.send(random.choice(responses))
 
         elif response_type == "joke_time":
             jokes = [
@@ -226,7 +221,7 @@ class EasterEggs:
                 "Why did the student eat his homework? Because the teacher said it was a piece of cake! (´｡• ᵕ •｡`)",
                 "What's a computer's favorite snack? Microchips! (*´꒳`*)",
             ]
-            await message.channel.send(random.choice(jokes))
+            await ctx.channel.send(random.choice(jokes))
 
         elif response_type == "singing":
             songs = [
@@ -234,7 +229,7 @@ class EasterEggs:
                 f"🎵 Work work work, then we play play play~ {self.personality.random_emoji()} 🎵",
                 f"🎵 Focus focus, you can do it~ Senpai's the best~ {self.personality.random_emoji()} 🎵",
             ]
-            await message.channel.send(random.choice(songs))
+            await ctx.channel.send(random.choice(songs))
 
         elif response_type == "dancing":
             responses = [
@@ -242,11 +237,11 @@ class EasterEggs:
                 f"*spins around* ✧(◕‿-)✧ Dance party time!",
                 f"*wiggles* ヾ(＾∇＾) Let's boogie!",
             ]
-            await message.channel.send(random.choice(responses))
+            await ctx.channel.send(random.choice(responses))
             gif_url = random.choice(self.celebration_gifs)
-            await message.channel.send(gif_url)
+            await ctx.channel.send(gif_url, priority=FLAVOR)
 
-    async def random_encouragement(self, message):
+    async def random_encouragement(self, ctx):
         """Send random encouragement"""
         encouragements = [
             f"Just wanted to say - you're doing great! {self.personality.random_emoji()} ♡",
@@ -255,33 +250,33 @@ class EasterEggs:
             f"Psst... you're wonderful! {self.personality.random_emoji()} ♡",
             f"Quick reminder that you matter! {self.personality.random_emoji()} ♡",
         ]
-        await message.channel.send(random.choice(encouragements))
+        await ctx.channel.send(random.choice(encouragements), priority=FLAVOR)
 
-    def modify_response_for_mode(self, response):
-        """Modify responses based on current mode"""
-        if self.current_mode == "tsundere_mode" and self.mode_duration > 0:
-            self.mode_duration -= 1
+    def modify_response_for_mode(self, session, response):
+        """Modify responses based on the user's current mode"""
+        if session.mode == "tsundere_mode" and session.mode_duration > 0:
+            session.mode_duration -= 1
             tsundere_endings = [" ...b-baka!", " It's not like I care!", " Hmph!", " ...idiot!"]
             return response.replace("senpai", "b-baka").replace("♡", "") + random.choice(tsundere_endings)
 
-        elif self.current_mode == "alexa_mode" and self.mode_duration > 0:
-            self.mode_duration -= 1
+        elif session.mode == "alexa_mode" and session.mode_duration > 0:
+            session.mode_duration -= 1
             return response.upper().replace("(◕‿◕)", "").replace("♡", "").replace("~", "")
 
-        elif self.current_mode == "kawaii_overload" and self.mode_duration > 0:
-            self.mode_duration -= 1
+        elif session.mode == "kawaii_overload" and session.mode_duration > 0:
+            session.mode_duration -= 1
             return response + " ✧･ﾟ: *✧･ﾟ:* ♡♡♡ Desu desu~!"
 
-        elif self.current_mode == "cat_mode" and self.mode_duration > 0:
-            self.mode_duration -= 1
+        elif session.mode == "cat_mode" and session.mode_duration > 0:
+            session.mode_duration -= 1
             return response.replace("!", " nya!").replace(".", " nya.") + " *purr*"
 
-        elif self.current_mode == "sleepy_mode" and self.mode_duration > 0:
-            self.mode_duration -= 1
+        elif session.mode == "sleepy_mode" and session.mode_duration > 0:
+            session.mode_duration -= 1
             return response.replace("!", "...") + " *yawn*"
 
         # Reset mode if duration is over
-        if self.mode_duration <= 0:
-            self.current_mode = "normal"
+        if session.mode_duration <= 0:
+            session.mode = "normal"
 
         return response
@@ -0,0 +1,99 @@
+from array import array
+from datetime import datetime, timedelta, timezone
+
+class ForecastStore:
+    """The next few days of forecast, kept as three parallel arrays
+
+    One slot per forecast step (3 hours for OpenWeather's free forecast): unix
+    time, temperature and chance of precipitation in %. Everything the bot wants
+    to know - rain later? coldest hour? - is a min/max over a slice of these.
+    """
+
+    def __init__(self, times=(), temps=(), rain=(), utc_offset=0):
+        self.times = array('q', times)      # unix seconds
+        self.temps = array('f', temps)      # in the configured units
+        self.rain = array('f', rain)        # chance of precipitation, 0-100
+        self.tz = timezone(timedelta(seconds=utc_offset))
+
+    @classmethod
+    def from_api(cls, data):
+        """Build from an OpenWeather /data/2.5/forecast response"""
+        entries = data.get('list', [])
+        return cls(
+            times=[entry['dt'] for entry in entries],
+            temps=[entry['main']['temp'] for entry in entries],
+            rain=[entry.get('pop', 0) * 100 for entry in entries],
+            utc_offset=data.get('city', {}).get('timezone', 0),
+        )
+
+    def __len__(self):
+        return len(self.times)
+
+    def local(self, timestamp):
+        return datetime.fromtimestamp(timestamp, self.tz)
+
+    def now(self):
+        return datetime.now(self.tz)
+
+    def span(self, start, end):
+        """Indexes of the slots covering [start, end) - datetimes or unix seconds"""
+        start = start.timestamp() if isinstance(start, datetime) else start
+        end = end.timestamp() if isinstance(end, datetime) else end
+        # A slot covers the step after its timestamp, so include the one already underway
+        step = self.times[1] - self.times[0] if len(self.times) > 1 else 0
+        first = next((i for i, t in enumerate(self.times) if t + step > start), len(self.times))
+        last = next((i for i in range(first, len(self.times)) if self.times[i] >= end), len(self.times))
+        return range(first, last)
+
+    def rest_of_day(self, now=None):
+        """Slots from now until midnight (local to the forecast location)"""
+        now = now or self.now()
+        midnight = (now + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+        return self.span(now, midnight)
+
+    def slot_at(self, when):
+        """The slot closest to a given time, or None if it's outside the forecast"""
+        if not self.times:
+            return None
+        when = when.timestamp() if isinstance(when, datetime) else when
+        step = self.times[1] - self.times[0] if len(self.times) > 1 else 0
+        if when < self.times[0] - step or when > self.times[-1] + step:
+            return None
+        return min(range(len(self.times)), key=lambda i: abs(self.times[i] - when))
+
+    def max_rain(self, slots):
+        """(chance %, slot) of the wettest slot in a span, or (0, None)"""
+        if not slots:
+            return 0.0, None
+        chance = max(self.rain[slots.start:slots.stop])
+        return chance, slots.start + self.rain[slots.start:slots.stop].index(chance)
+
+    def coldest(self, slots):
+        """(temp, slot) of the coldest slot in a span, or (None, None)"""
+        if not slots:
+            return None, None
+        temp = min(self.temps[slots.start:slots.stop])
+        return temp, slots.start + self.temps[slots.start:slots.stop].index(temp)
+
+    def warmest(self, slots):
+        """(temp, slot) of the warmest slot in a span, or (None, None)"""
+        if not slots:
+            return None, None
+        temp = max(self.temps[slots.start:slots.stop])
+        return temp, slots.start + self.temps[slots.start:slots.stop].index(temp)
+
+    def recommendations(self, rain_threshold, cold_threshold, now=None):
+        """What's worth bringing today: {'umbrella': (chance, slot), 'jacket': (temp, slot)}"""
+        today = self.rest_of_day(now)
+        recs = {}
+        chance, slot = self.max_rain(today)
+        if slot is not None and chance > rain_threshold:
+            recs['umbrella'] = (chance, slot)
+        temp, slot = self.coldest(today)
+        if slot is not None and temp < cold_threshold:
+            recs['jacket'] = (temp, slot)
+        return recs
+
+    def hour_label(self, slot):
+        """'5 PM' style label for a slot"""
+        return self.local(self.times[slot]).strftime('%I %p').lstrip('0')
@@ -0,0 +1,185 @@
+import functools
+import struct
+import time
+from array import array
+from bisect import bisect_left
+from datetime import date, datetime, timedelta
+
+import botlog
+from storage import data_path
+
+log = botlog.get_logger('history')
+
+KINDS = ('study', 'break')
+STUDY = KINDS.index('study')
+
+# One fixed-size record per session: user, start (unix seconds), minutes, kind, finished
+RECORD = struct.Struct('<qqfBB')
+
+@functools.lru_cache(maxsize=4096)
+def local_slot(quarter):
+    """(date ordinal, hour) in local time for a quarter hour since the epoch
+
+    Every UTC offset is a whole number of quarter hours, so sessions starting in
+    the same quarter share a day and hour - loading years of them in order only
+    works out a datetime once per quarter hour instead of once per session.
+    """
+    when = datetime.fromtimestamp(quarter * 900)
+    return when.toordinal(), when.hour
+
+class Rollup:
+    """One user's focus time, pre-summed per day and per hour of the day
+
+    Only study sessions count as focus. Days are kept sorted, so "this week" or
+    a streak is a short walk back from the end instead of a scan over years.
+    """
+
+    __slots__ = ('days', 'minutes', 'hours', 'sessions', 'total')
+
+    def __init__(self):
+        self.days = array('l')              # date ordinals, ascending
+        self.minutes = array('f')           # focus minutes on each of those days
+        self.hours = array('f', [0.0] * 24) # focus minutes by hour the session started
+        self.sessions = 0
+        self.total = 0.0
+
+    def add(self, day, hour, minutes):
+        if not self.days or self.days[-1] < day:
+            self.days.append(day)
+            self.minutes.append(minutes)
+        else:
+            # Usually today - older days only turn up if the clock moved
+            i = bisect_left(self.days, day)
+            if self.days[i] == day:
+                self.minutes[i] += minutes
+            else:
+                self.days.insert(i, day)
+                self.minutes.insert(i, minutes)
+        self.hours[hour] += minutes
+        self.sessions += 1
+        self.total += minutes
+
+    def since(self, day):
+        """Focus minutes from `day` (a date) on"""
+        return sum(self.minutes[bisect_left(self.days, day.toordinal()):])
+
+    def on(self, day):
+        """Focus minutes on one day"""
+        i = bisect_left(self.days, day.toordinal())
+        return self.minutes[i] if i < len(self.days) and self.days[i] == day.toordinal() else 0.0
+
+    def streak(self, today):
+        """Days in a row with some focus, up to today (or yesterday, if today's still empty)"""
+        day = today.toordinal()
+        i = len(self.days) - 1
+        if i >= 0 and self.days[i] == day:
+            day += 1
+        streak = 0
+        while i >= 0 and self.days[i] == day - 1:
+            streak += 1
+            day -= 1
+            i -= 1
+        return streak
+
+    def average(self):
+        """Average focus session length in minutes"""
+        return self.total / self.sessions if self.sessions else 0.0
+
+    def best_hour(self):
+        """Hour of the day (0-23) that most focus time starts in, or None"""
+        best = max(self.hours)
+        return self.hours.index(best) if best else None
+
+class SessionHistory:
+    """Every finished or stopped pomodoro session, kept column by column
+
+    The raw sessions are parallel arrays (22 bytes each on disk, appended as they
+    happen), and each user gets a Rollup on top, so the questions people actually
+    ask - today, this week, streak, average, best hour - never touch the raw rows.
+    """
+
+    def __init__(self, history_file=None):
+        self.users = array('q')
+        self.starts = array('q')        # unix seconds
+        self.lengths = array('f')       # minutes actually done
+        self.kinds = array('B')         # index into KINDS
+        self.finished = array('B')      # 1 = ran to the end, 0 = stopped early
+        self.rollups = {}               # user -> Rollup
+        self.path = data_path(history_file) if history_file else None
+        self.file = None
+        if self.path:
+            self.load()
+
+    def load(self):
+        started = time.perf_counter()
+        try:
+            with open(self.path, 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            return
+
+        # Drop a half-written last record so new ones line up again
+        whole = len(data) - len(data) % RECORD.size
+        if whole != len(data):
+            log.warning("⚠️ Dropping damaged history record", file=self.path)
+            with open(self.path, 'r+b') as f:
+                f.truncate(whole)
+
+        for user_id, start, minutes, kind, finished in RECORD.iter_unpack(data[:whole]):
+            self.add(user_id, start, minutes, kind, finished)
+        log.debug("📚 Session history loaded", sessions=len(self),
+                  ms=round((time.perf_counter() - started) * 1000, 1))
+
+    def record(self, user_id, start, minutes, kind, finished):
+        """Remember one session - `kind` is 'study' or 'break', `start` is unix seconds"""
+        kind = KINDS.index(kind)
+        start = int(start)
+        self.add(user_id, start, minutes, kind, finished)
+        if self.path:
+            try:
+                if self.file is None:
+                    self.file = open(self.path, 'ab')
+                self.file.write(RECORD.pack(user_id, start, minutes, kind, finished))
+                self.file.flush()
+            except OSError:
+                log.exception("❌ Could not save session", file=self.path)
+
+    def add(self, user_id, start, minutes, kind, finished):
+        self.users.append(user_id)
+        self.starts.append(start)
+        self.lengths.append(minutes)
+        self.kinds.append(kind)
+        self.finished.append(int(finished))
+        if kind == STUDY:
+            self.roll_up(user_id, start, minutes)
+
+    def roll_up(self, user_id, start, minutes):
+        rollup = self.rollups.get(user_id)
+        if rollup is None:
+            rollup = self.rollups[user_id] = Rollup()
+        rollup.add(*local_slot(start // 900), minutes)
+
+    def rollup(self, user_id):
+        """A user's Rollup (an empty one if they've never studied with us)"""
+        return self.rollups.get(user_id) or Rollup()
+
+    def summary(self, user_id, today=None):
+        """Everything the stats replies need, in one go"""
+        today = today or date.today()
+        rollup = self.rollup(user_id)
+        return {
+            'today': rollup.on(today),
+            'week': rollup.since(today - timedelta(days=today.weekday())),
+            'streak': rollup.streak(today),
+            'average': rollup.average(),
+            'sessions': rollup.sessions,
+            'best_hour': rollup.best_hour(),
+        }
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def __len__(self):
+        return len(self.users)
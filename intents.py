@@ -0,0 +1,174 @@
+import re
+
+try:
+    from re import _parser as sre_parse     # Python 3.11+
+    from re._constants import BRANCH, LITERAL, SUBPATTERN
+except ImportError:
+    import sre_parse
+    from sre_constants import BRANCH, LITERAL, SUBPATTERN
+
+class IntentMatch:
+    """The intent that won for a message (or for one feature)"""
+
+    def __init__(self, name, namespace, priority, pattern, groups):
+        self.name = name
+        self.namespace = namespace
+        self.priority = priority
+        self.pattern = pattern
+        self.groups = groups
+
+    def group(self, index=1):
+        """Get a captured group, like the duration in 'study for 25 minutes'"""
+        if index < 1 or index > len(self.groups):
+            return None
+        return self.groups[index - 1]
+
+    def __repr__(self):
+        return f"IntentMatch({self.namespace}.{self.name}, priority={self.priority}, groups={self.groups})"
+
+class IntentResult:
+    """Everything one scan found, best match overall and per feature"""
+
+    def __init__(self, best_by_namespace):
+        self.best_by_namespace = best_by_namespace
+        self.winner = min(best_by_namespace.values(), key=lambda m: m.priority, default=None)
+
+    def best(self, namespace=None):
+        """Best match overall, or the best one for a single feature"""
+        if namespace is None:
+            return self.winner
+        return self.best_by_namespace.get(namespace)
+
+    def __bool__(self):
+        return self.winner is not None
+
+class IntentRouter:
+    """Works out which intents a message matches without trying every pattern on it
+
+    Patterns are added in priority order (first added = highest priority), the same
+    order the old chain of re.search calls used. At compile time each pattern is
+    boiled down to literal text it can't match without (like 'study for ' or one
+    of 'hi'/'hello'/'hey'), and all of those go into one literal-only scanner. A
+    message is scanned once, and only the patterns whose required text showed up
+    get run - in priority order, stopping at each feature's first hit. Patterns we
+    can't find a required literal for are always run.
+    """
+
+    def __init__(self):
+        self.specs = []  # (name, namespace, pattern)
+        self.patterns = []
+        self.scanner = None
+        self.covers = {}        # literal the scanner can report -> pattern indexes it makes candidates
+        self.always = ()        # pattern indexes with no required literal
+
+    def add(self, namespace, name, pattern):
+        """Add a single pattern for an intent"""
+        if self.scanner is not None:
+            raise RuntimeError("IntentRouter is already compiled, add patterns before compile()")
+        self.specs.append((name, namespace, pattern))
+
+    def add_feature(self, namespace, intents):
+        """Add a feature's (intent name, pattern) list, keeping its order"""
+        for name, pattern in intents:
+            self.add(namespace, name, pattern)
+
+    def compile(self):
+        """Build the patterns and the literal scanner - do this once at startup"""
+        self.patterns = [re.compile(pattern) for _, _, pattern in self.specs]
+        required = [required_literals(pattern) for _, _, pattern in self.specs]
+        self.always = tuple(index for index, needles in enumerate(required) if needles is None)
+
+        # The scanner reports the longest literal starting at each spot, so a hit
+        # also stands for every literal that's a prefix of it
+        literals = {needle for needles in required if needles for needle in needles}
+        self.covers = {}
+        for found in literals:
+            self.covers[found] = tuple(
+                index for index, needles in enumerate(required)
+                if needles and any(found.startswith(needle) for needle in needles)
+            )
+        self.scanner = re.compile(f"(?=({literal_trie(literals)}))") if literals else None
+        return self
+
+    def candidates(self, content):
+        """Indexes of the patterns that could match, in priority order"""
+        if self.scanner is None:
+            return self.always
+        found = set(self.scanner.findall(content))
+        if not found:
+            return self.always
+        indexes = set(self.always)
+        for literal in found:
+            indexes.update(self.covers[literal])
+        return sorted(indexes)
+
+    def match(self, content):
+        """Scan a message once and return an IntentResult"""
+        if self.scanner is None and not self.patterns:
+            self.compile()
+
+        results = {}
+        for index in self.candidates(content):
+            name, namespace, pattern = self.specs[index]
+            if namespace in results:
+                continue
+            found = self.patterns[index].search(content)
+            if found:
+                results[namespace] = IntentMatch(name, namespace, index, pattern, found.groups())
+
+        return IntentResult(results)
+
+def required_literals(pattern):
+    """Strings at least one of which has to be in any text the pattern matches, or None"""
+    parsed = sre_parse.parse(pattern)
+    if parsed.state.flags & re.IGNORECASE:
+        return None
+    return _required(parsed)
+
+def _required(items):
+    options = []
+    run = ''
+    for op, av in list(items) + [(None, None)]:
+        if op is LITERAL:
+            run += chr(av)
+            continue
+        if run:
+            options.append((run,))
+            run = ''
+        if op is SUBPATTERN:
+            inner = _required(av[-1])
+            if inner:
+                options.append(inner)
+        elif op is BRANCH:
+            alternatives = [_required(branch) for branch in av[1]]
+            if all(alternatives):
+                options.append(tuple(needle for needles in alternatives for needle in needles))
+    if not options:
+        return None
+    # Longer literals rule out more messages
+    return max(options, key=lambda needles: min(len(needle) for needle in needles))
+
+def literal_trie(literals):
+    """Regex matching any of the literals, with shared prefixes factored out
+
+    The regex engine only checks the first character of each alternative before
+    moving on, so a trie keeps the work per position small however many literals
+    there are. Greedy, so it matches the longest literal starting at a spot.
+    """
+    trie = {}
+    for literal in literals:
+        node = trie
+        for char in literal:
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def build(node):
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        if '' in node:
+            return f'(?:{body})?'
+        return body
+
+    return build(trie)
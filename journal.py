@@ -0,0 +1,120 @@
+import asyncio
+import json
+import os
+
+import botlog
+from storage import data_path
+
+log = botlog.get_logger('journal')
+
+class Journal:
+    """Append-only log of JSON records that survives crashes
+
+    append() only buffers the record - a background flush writes everything
+    buffered since the last one with a single write and fsync (group commit), so
+    a burst of timers costs one disk sync instead of one each. On startup the log
+    is replayed, then compacted down to what's still live so it never grows
+    without bound.
+    """
+
+    def __init__(self, name, flush_delay=0.05):
+        self.path = data_path(name)
+        self.flush_delay = flush_delay    # how long appends wait to be batched up
+        self.pending = []
+        self.flusher = None
+        self.records = 0                  # lines in the file (for deciding when to compact)
+        self.file = None
+
+    def replay(self):
+        """Every record in the log, oldest first (a half-written last line is skipped)"""
+        try:
+            with open(self.path) as f:
+                lines = f.read().splitlines()
+        except FileNotFoundError:
+            lines = []
+
+        try:
+            # One parse for the whole log is a lot quicker than one per line
+            records = json.loads('[' + ','.join(lines) + ']')
+        except ValueError:
+            records = []
+            for line in lines:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    # Torn write from a crash - nothing after it was synced either.
+                    # Cut it off, or the next append would be glued onto it
+                    log.warning("⚠️ Skipping damaged journal entry", file=self.path)
+                    self.replace(records)
+                    break
+        self.records = len(records)
+        return records
+
+    async def rewrite(self, snapshot):
+        """Swap the log for the records `snapshot()` returns (atomically, and synced)
+
+        The snapshot is taken once any in-flight flush is done, so it has to
+        describe everything appended so far.
+        """
+        if self.flusher is not None:
+            await asyncio.shield(self.flusher)
+        records = snapshot()
+        self.pending = []
+        self.replace(records)
+
+    def replace(self, records):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            f.write(''.join(json.dumps(record) + '\n' for record in records))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        self.records = len(records)
+
+    def append(self, record):
+        self.pending.append(json.dumps(record) + '\n')
+        self.records += 1
+        if self.flusher is None:
+            try:
+                self.flusher = asyncio.get_running_loop().create_task(self.flush_later())
+            except RuntimeError:
+                # No event loop (scripts, shutdown) - just write it now
+                self.flush_now()
+
+    async def flush_later(self):
+        try:
+            await asyncio.sleep(self.flush_delay)
+            while self.pending:
+                lines, self.pending = self.pending, []
+                # fsync can take a while, keep it off the event loop
+                await asyncio.to_thread(self.write, lines)
+        finally:
+            self.flusher = None
+
+    def flush_now(self):
+        if self.pending:
+            lines, self.pending = self.pending, []
+            self.write(lines)
+
+    def write(self, lines):
+        try:
+            if self.file is None:
+                self.file = open(self.path, 'a')
+            self.file.write(''.join(lines))
+            self.file.flush()
+            os.fsync(self.file.fileno())
+        except OSError:
+            log.exception("❌ Could not write journal", file=self.path)
+
+    async def close(self):
+        """Flush whatever's buffered and close the file"""
+        if self.flusher is not None:
+            await asyncio.shield(self.flusher)
+        self.flush_now()
+        if self.file is not None:
+            self.file.close()
+            self.file = None
@@ -0,0 +1,73 @@
+from collections import deque
+
+class KeywordIndex:
+    """Aho-Corasick index mapping trigger keywords to the features that declared them
+
+    Every feature's keywords and phrases go into one automaton, so a message is
+    walked once character by character no matter how many features are registered.
+    Matching is plain substring matching, same as the old `keyword in message` checks.
+    """
+
+    def __init__(self):
+        self.goto = [{}]      # node -> {char: next node}
+        self.fail = [0]       # node -> fallback node
+        self.output = [[]]    # node -> [(owner, keyword), ...] ending here
+        self.built = False
+
+    def add(self, owner, keyword):
+        """Register one keyword or phrase for a feature"""
+        if self.built:
+            raise RuntimeError("KeywordIndex is already built, add keywords before build()")
+
+        node = 0
+        for char in keyword.lower():
+            next_node = self.goto[node].get(char)
+            if next_node is None:
+                next_node = len(self.goto)
+                self.goto[node][char] = next_node
+                self.goto.append({})
+                self.fail.append(0)
+                self.output.append([])
+            node = next_node
+        self.output[node].append((owner, keyword))
+
+    def add_feature(self, owner, keywords):
+        """Register a feature's whole keyword list"""
+        for keyword in keywords:
+            self.add(owner, keyword)
+
+    def build(self):
+        """Work out the failure links - do this once at startup"""
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self.goto[node].items():
+                queue.append(child)
+
+                fallback = self.fail[node]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[child] = self.goto[fallback].get(char, 0)
+
+                # Anything that ends at the fallback also ends here
+                self.output[child] = self.output[child] + self.output[self.fail[child]]
+
+        self.built = True
+        return self
+
+    def scan(self, text):
+        """Walk the text once, return {owner: first keyword hit} for every feature hit"""
+        if not self.built:
+            self.build()
+
+        goto, fail, output = self.goto, self.fail, self.output
+        hits = {}
+        node = 0
+        for char in text:
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            for owner, keyword in output[node]:
+                if owner not in hits:
+                    hits[owner] = keyword
+        return hits
@@ -3,10 +3,6 @@ from personality import VTuberPersonality
 from pomodoro import PomodoroFeature
 from morning import MorningDigest
 
-# Easter egg data
-current_mode = "normal"
-mode_duration = 0
-
 # Curated safe gifs
 celebration_gifs = [
     "https://tenor.com/view/anime-happy-excited-celebration-yay-gif-16043828",
@@ -17,7 +13,6 @@ celebration_gifs = [
 import discord
 from discord.ext import commands
 import os
-import re
 import random
 import asyncio
 
@@ -25,17 +20,45 @@ import asyncio
 from personality import VTuberPersonality
 from pomodoro import PomodoroFeature
 from morning import MorningDigest
-
-# Simple easter egg variables
-current_mode = "normal"
-mode_duration = 0
+from intents import IntentRouter
+from context import MessageContext
+from keywords import KeywordIndex
+import botlog
+from metrics import metrics
+from sessions import SessionStore
+from auth import Allowlist
+from outbox import Outbox, FLAVOR
+
+# Logs go through a queue to a writer thread, never straight to stdout
+botlog.setup()
+log = botlog.get_logger('main')
+
+# Who's allowed to talk to us - read once here, not on every message
+allowlist = Allowlist()
+
+# Merges bursts of replies into as few Discord messages as possible
+outbox = Outbox()
+
+# Per-user state (personality modes, rant zone...) - nothing global anymore!
+sessions = SessionStore()
 # from music import MusicFeature  # Future feature!
 
 # Bot setup
 intents = discord.Intents.default()
 intents.message_content = True
 intents.dm_messages = True
-bot = commands.Bot(command_prefix=None, intents=intents)
+class CalliopeBot(commands.Bot):
+    async def setup_hook(self):
+        # Long-lived connections get opened once, before any messages come in
+        await morning.start()
+        morning.prewarmer.start()
+
+    async def close(self):
+        await morning.close()
+        await pomodoro.close()
+        await super().close()
+
+bot = CalliopeBot(command_prefix=None, intents=intents)
 
 # Initialize components
 personality = VTuberPersonality()
@@ -49,13 +72,76 @@ features = {
     # 'music': music,  # Add when ready!
 }
 
+# Built-in intents, checked before any feature (order = priority!)
+core_intents = [
+    ("stats", r'^stats$'),
+    ("greeting", r'\b(hi|hello|hey|hiya|yo|ohayo|konnichiwa)\b'),
+    ("help", r'\b(help|commands|what can you do)\b'),
+    ("tsundere", r'\b(tsundere mode|be tsundere)\b'),
+    ("alexa", r'\b(alexa mode|business mode|professional mode)\b'),
+    ("kawaii", r'\b(kawaii overload|maximum kawaii|ultra kawaii)\b'),
+    ("cat", r'\b(cat mode|neko mode|meow mode)\b'),
+    ("compliment", r'\byou\'?re (cute|adorable|sweet|awesome|amazing)\b'),
+    ("thanks", r'\bthank you\b'),
+    ("joke", r'\btell me a joke\b'),
+    ("rant", r'\b(rant zone|need to rant|let me rant|i need to vent|need to vent)\b'),
+    ("comfort", r"i'?m (sad|depressed|down|upset|hurt|lonely|anxious|stressed)"),
+    ("comfort", r"feeling (sad|down|upset|hurt|lonely|anxious|stressed|overwhelmed)"),
+    ("comfort", r"i feel (sad|down|upset|hurt|lonely|anxious|stressed|terrible|awful|bad)"),
+    ("comfort", r"comfort me"),
+    ("comfort", r"i need comfort"),
+    ("comfort", r"hug me"),
+    ("comfort", r"having a (bad|rough|hard|tough) (day|time)"),
+]
+
+# One compiled matcher for everything - built once at startup
+router = IntentRouter()
+router.add_feature('core', core_intents)
+for feature_name, feature in features.items():
+    router.add_feature(feature_name, feature.intents)
+router.compile()
+
+# Keyword index so we only ask features that could plausibly care
+keyword_index = KeywordIndex()
+for feature_name, feature in features.items():
+    keyword_index.add_feature(feature_name, feature.keywords)
+keyword_index.build()
+
+async def open_timer_channel(channel_id, user_id):
+    """Find where a restored timer should report - its old channel, or a fresh DM"""
+    channel = None
+    try:
+        if channel_id:
+            channel = bot.get_channel(channel_id) or await bot.fetch_channel(channel_id)
+        if channel is None:
+            user = bot.get_user(user_id) or await bot.fetch_user(user_id)
+            channel = await user.create_dm()
+    except discord.HTTPException:
+        log.warning("⚠️ Could not reopen timer channel", user=user_id, channel=channel_id)
+        return None
+    return outbox.channel(channel)
+
 @bot.event
 async def on_ready():
-    print(f'🌟 {bot.user} is ready!')
-    print(f'✨ Kawaii study bot activated! (◕‿◕)♡')
-    print(f'🌅 Morning digest available on demand!')
-    print(f'💝 Care & rant features built-in!')
-    print(f'🔧 Available features: {list(features.keys())}')
+    log.info(f'🌟 {bot.user} is ready!')
+    log.info(f'✨ Kawaii study bot activated! (◕‿◕)♡')
+    log.info(f'🌅 Morning digest available on demand!')
+    log.info(f'💝 Care & rant features built-in!')
+    log.info(f'🔧 Available features: {list(features.keys())}')
+
+    # Pick up allowlist file edits without a restart
+    await allowlist.watch()
+    if allowlist.owner_id is None:
+        log.warning("⚠️ No owner set - set OWNER_USER_ID to use the stats command")
+
+    # Timers that were running when we went down (only the first time we connect)
+    await pomodoro.restore(open_timer_channel)
+
+    # Local-only metrics endpoint (METRICS_PORT=0 turns it off)
+    try:
+        await metrics.start_server(port=int(os.environ.get('METRICS_PORT', 8765)))
+    except (OSError, ValueError):
+        log.exception("❌ Could not start metrics endpoint")
 
 @bot.event
 async def on_message(message):
@@ -68,135 +154,156 @@ async def on_message(message):
         return
 
     # Check if authorized user
-    try:
-        authorized_user_id = int(os.environ['AUTHORIZED_USER_ID'])
-    except (KeyError, ValueError):
-        print("❌ AUTHORIZED_USER_ID secret not set!")
+    if not allowlist:
+        log.error("❌ No authorized users configured (AUTHORIZED_USER_ID / AUTHORIZED_USERS_FILE)!")
         return
 
-    if message.author.id != authorized_user_id:
+    if message.author.id not in allowlist:
         await message.channel.send(personality.unauthorized())
         return
 
-    # Process the message
-    await handle_message(message)
+    # Parse once, then everything downstream reads from the context
+    ctx = MessageContext(message, router, keyword_index, sessions, outbox)
+    log.debug("📨 Message received", author=ctx.author_id, text=ctx.text)
+    with metrics.timer('handle_message'):
+        await handle_message(ctx)
+
+async def pick_feature(ctx):
+    """Name of the feature that should handle a message, or None
 
-async def handle_message(message):
-    global current_mode, mode_duration
-    content = message.content.lower().strip()
+    Features that actually matched one of their intents get asked first, best
+    intent first - so "what time will it rain" goes to the forecast and not to
+    the timers just because it says "time". Features with only a keyword hit
+    come after, in registration order.
+    """
+    matched = sorted((match for namespace, match in ctx.intents.best_by_namespace.items() if namespace in features),
+                     key=lambda match: match.priority)
+    candidates = [match.namespace for match in matched]
+    candidates += [name for name in features if name not in candidates]
+
+    for feature_name in candidates:
+        feature = features[feature_name]
+        # Skip ones whose keywords never showed up
+        if feature.keywords and feature_name not in ctx.keyword_hits:
+            continue
+
+        log.debug("🔍 Checking feature", feature=feature_name)
+        with metrics.timer(f'feature.{feature_name}.can_handle'):
+            can_handle = await feature.can_handle(ctx)
+        if can_handle:
+            return feature_name
+        log.debug("❌ Feature cannot handle this", feature=feature_name)
+    return None
+
+async def handle_message(ctx):
+    session = ctx.session
+
+    # The intent scan already ran when the context was built
+    intent = ctx.intents.best('core')
+    intent_name = intent.name if intent else None
+
+    winner = ctx.intents.best()
+    session.last_intent = f"{winner.namespace}.{winner.name}" if winner else None
+
+    # Owner-only latency stats
+    if intent_name == "stats":
+        await show_stats(ctx)
+        return
 
     # Check for greetings
-    if re.search(r'\b(hi|hello|hey|hiya|yo|ohayo|konnichiwa)\b', content):
+    if intent_name == "greeting":
         response = personality.greeting()
-        response = modify_response_for_mode(response)
-        await message.channel.send(response)
+        response = modify_response_for_mode(session, response)
+        await ctx.channel.send(response)
         return
 
     # Check for help
-    if re.search(r'\b(help|commands|what can you do)\b', content):
-        await show_help(message)
+    if intent_name == "help":
+        await show_help(ctx)
         return
 
     # Easter egg triggers
-    if re.search(r'\b(tsundere mode|be tsundere)\b', content):
-        current_mode = "tsundere"
-        mode_duration = 5
-        await message.channel.send(f"H-huh?! Tsundere mode?! {personality.get_error_emoji()} I-it's not like I wanted to help you or anything! Baka!")
+    if intent_name == "tsundere":
+        session.set_mode("tsundere", 5)
+        await ctx.channel.send(f"H-huh?! Tsundere mode?! {personality.get_error_emoji()} I-it's not like I wanted to help you or anything! Baka!")
         return
 
-    if re.search(r'\b(alexa mode|business mode|professional mode)\b', content):
-        current_mode = "alexa"
-        mode_duration = 5
-        await message.channel.send("ALEXA MODE ACTIVATED. I AM NOW IN PROFESSIONAL ASSISTANCE MODE.")
+    if intent_name == "alexa":
+        session.set_mode("alexa", 5)
+        await ctx.channel.send("ALEXA MODE ACTIVATED. I AM NOW IN PROFESSIONAL ASSISTANCE MODE.")
         return
 
-    if re.search(r'\b(kawaii overload|maximum kawaii|ultra kawaii)\b', content):
-        current_mode = "kawaii"
-        mode_duration = 5
-        await message.channel.send(f"KYAAAAA~! ✧･ﾟ: *✧･ﾟ:* MAXIMUM KAWAII ENGAGED! (ﾉ◕ヮ◕)ﾉ*:･ﾟ✧*:･ﾟ✧")
+    if intent_name == "kawaii":
+        session.set_mode("kawaii", 5)
+        await ctx.channel.send(f"KYAAAAA~! ✧･ﾟ: *✧･ﾟ:* MAXIMUM KAWAII ENGAGED! (ﾉ◕ヮ◕)ﾉ*:･ﾟ✧*:･ﾟ✧")
         return
 
-    if re.search(r'\b(cat mode|neko mode|meow mode)\b', content):
-        current_mode = "cat"
-        mode_duration = 5
-        await message.channel.send(f"Nyaa~! {personality.random_emoji()} *transforms into neko mode* Meow meow!")
+    if intent_name == "cat":
+        session.set_mode("cat", 5)
+        await ctx.channel.send(f"Nyaa~! {personality.random_emoji()} *transforms into neko mode* Meow meow!")
         return
 
     # Special compliment responses
-    if re.search(r'\byou\'?re (cute|adorable|sweet|awesome|amazing)\b', content):
+    if intent_name == "compliment":
         responses = [
             f"Kyaa~! {personality.random_emoji()} You're making me blush! You're even cuter though! ♡",
             f"Ehehe~ {personality.random_emoji()} Thank you! But you're the amazing one! ♡",
             f"Aww! {personality.random_emoji()} You're going to make me cry happy tears! ♡",
         ]
-        response = modify_response_for_mode(random.choice(responses))
-        await message.channel.send(response)
+        response = modify_response_for_mode(session, random.choice(responses))
+        await ctx.channel.send(response)
         # Send a cute celebration gif!
         celebration_gifs = [
             "https://tenor.com/view/giggling-kicking-feet-sped-up-asagao-to-kase-san-yuri-gif-7086509730415310709",
             "https://tenor.com/view/anime-fuck-yeah-yes-yass-gif-5881788"
         ]
-        await message.channel.send(random.choice(celebration_gifs))
+        await ctx.channel.send(random.choice(celebration_gifs), priority=FLAVOR)
         return
 
     # Thank you responses
-    if re.search(r'\bthank you\b', content):
+    if intent_name == "thanks":
         responses = [
             f"Aww, you're so welcome! {personality.random_emoji()} It makes me happy to help! ♡",
             f"No need to thank me! {personality.random_emoji()} I love spending time with you! ♡",
             f"Anytime, senpai! {personality.random_emoji()} That's what I'm here for! ♡",
         ]
-        response = modify_response_for_mode(random.choice(responses))
-        await message.channel.send(response)
+        response = modify_response_for_mode(session, random.choice(responses))
+        await ctx.channel.send(response)
         return
 
     # Joke requests
-    if re.search(r'\btell me a joke\b', content):
+    if intent_name == "joke":
         jokes = [
             "Why don't scientists trust atoms? Because they make up everything! (◕‿◕)",
             "What do you call a study group full of introverts? A quiet riot! ヽ(°〇°)ﾉ",
             "Why did the student eat his homework? Because the teacher said it was a piece of cake! (´｡• ᵕ •｡`)",
             "What's a computer's favorite snack? Microchips! (*´꒳`*)",
         ]
-        response = modify_response_for_mode(random.choice(jokes))
-        await message.channel.send(response)
+        response = modify_response_for_mode(session, random.choice(jokes))
+        await ctx.channel.send(response)
         return
 
     # Check for rant zone FIRST
-    if re.search(r'\b(rant zone|need to rant|let me rant|i need to vent|need to vent)\b', content):
-        await handle_rant_zone(message)
+    if intent_name == "rant":
+        await handle_rant_zone(ctx)
         return
 
     # Check for care/comfort requests
-    care_patterns = [
-        r"i'?m (sad|depressed|down|upset|hurt|lonely|anxious|stressed)",
-        r"feeling (sad|down|upset|hurt|lonely|anxious|stressed|overwhelmed)",
-        r"i feel (sad|down|upset|hurt|lonely|anxious|stressed|terrible|awful|bad)",
-        r"comfort me",
-        r"i need comfort",
-        r"hug me",
-        r"having a (bad|rough|hard|tough) (day|time)",
-    ]
+    if intent_name == "comfort":
+        await handle_comfort(ctx)
+        return
 
-    for pattern in care_patterns:
-        if re.search(pattern, content):
-            await handle_comfort(message)
-            return
+    feature_name = await pick_feature(ctx)
+    if feature_name:
+        log.debug("✅ Feature will handle this message", feature=feature_name)
+        with metrics.timer(f'feature.{feature_name}.handle'):
+            await features[feature_name].handle(ctx)
+        return
 
-    # Check each feature
-    for feature_name, feature in features.items():
-        print(f"🔍 Checking if {feature_name} can handle: '{content}'")
-        if await feature.can_handle(content):
-            print(f"✅ {feature_name} will handle this message")
-            await feature.handle(message)
-            return
-        else:
-            print(f"❌ {feature_name} cannot handle this")
-
-    print(f"📝 No feature could handle '{content}', using casual response")
+    log.debug("📝 No feature could handle this, using casual response")
     # Default casual response with mode modification
     response = personality.casual_response()
-    response = modify_response_for_mode(response)
+    response = modify_response_for_mode(session, response)
 
     # 5% chance for random encouragement
     if random.random() < 0.05:
@@ -205,38 +312,36 @@ async def handle_message(message):
             f"Random reminder: you're awesome! {personality.random_emoji()} ♡",
             f"Hey! You're pretty amazing, you know that? {personality.random_emoji()} ♡",
         ]
-        response = modify_response_for_mode(random.choice(encouragements))
-
-    await message.channel.send(response)
+        response = modify_response_for_mode(session, random.choice(encouragements))
 
-def modify_response_for_mode(response):
-    """Modify responses based on current personality mode"""
-    global current_mode, mode_duration
+    await ctx.channel.send(response)
 
-    if current_mode == "tsundere" and mode_duration > 0:
-        mode_duration -= 1
+def modify_response_for_mode(session, response):
+    """Modify responses based on the user's current personality mode"""
+    if session.mode == "tsundere" and session.mode_duration > 0:
+        session.mode_duration -= 1
         tsundere_endings = [" ...b-baka!", " It's not like I care!", " Hmph!", " ...idiot!"]
         return response.replace("senpai", "b-baka").replace("♡", "") + random.choice(tsundere_endings)
 
-    elif current_mode == "alexa" and mode_duration > 0:
-        mode_duration -= 1
+    elif session.mode == "alexa" and session.mode_duration > 0:
+        session.mode_duration -= 1
         return response.upper().replace("(◕‿◕)", "").replace("♡", "").replace("~", "").replace("!", ".")
 
-    elif current_mode == "kawaii" and mode_duration > 0:
-        mode_duration -= 1
+    elif session.mode == "kawaii" and session.mode_duration > 0:
+        session.mode_duration -= 1
         return response + " ✧･ﾟ: *✧･ﾟ:* ♡♡♡ Desu desu~!"
 
-    elif current_mode == "cat" and mode_duration > 0:
-        mode_duration -= 1
+    elif session.mode == "cat" and session.mode_duration > 0:
+        session.mode_duration -= 1
         return response.replace("!", " nya!").replace(".", " nya.") + " *purr*"
 
     # Reset mode if duration is over
-    if mode_duration <= 0:
-        current_mode = "normal"
+    if session.mode_duration <= 0:
+        session.mode = "normal"
 
     return response
 
-async def handle_rant_zone(message):
+async def handle_rant_zone(ctx):
     """Handle rant zone activation"""
     rant_openings = [
         f"RANT ZONE ACTIVATED! {personality.random_emoji()} I'm here to listen. Let it ALL out! 🗣️",
@@ -246,7 +351,8 @@ async def handle_rant_zone(message):
         f"VENT AWAY! {personality.random_emoji()} No judgment, just ears. Tell me everything! 💭",
     ]
 
-    await message.channel.send(random.choice(rant_openings))
+    await ctx.channel.send(random.choice(rant_openings))
+    ctx.session.rant_active = True
     await asyncio.sleep(1)
 
     encouragements = [
@@ -256,9 +362,9 @@ async def handle_rant_zone(message):
         f"What's eating at you? I'm ready for the full story, no limits! {personality.random_emoji()}",
     ]
 
-    await message.channel.send(random.choice(encouragements))
+    await ctx.channel.send(random.choice(encouragements))
 
-async def handle_comfort(message):
+async def handle_comfort(ctx):
     """Handle comfort requests"""
     comfort_responses = [
         f"Oh sweetie... {personality.get_error_emoji()} I'm here for you. You're not alone. ♡",
@@ -268,7 +374,7 @@ async def handle_comfort(message):
         f"Sweet senpai... {personality.get_error_emoji()} You don't have to face this alone. I believe in you. ♡",
     ]
 
-    await message.channel.send(random.choice(comfort_responses))
+    await ctx.channel.send(random.choice(comfort_responses))
     await asyncio.sleep(2)
 
     follow_ups = [
@@ -278,9 +384,17 @@ async def handle_comfort(message):
         f"It's okay to rest. It's okay to take things one moment at a time. {personality.random_emoji()}",
     ]
 
-    await message.channel.send(random.choice(follow_ups))
+    await ctx.channel.send(random.choice(follow_ups))
+
+async def show_stats(ctx):
+    """Latency percentiles for each stage - only for the owner!"""
+    if not allowlist.is_owner(ctx.author_id):
+        await ctx.channel.send(personality.unauthorized())
+        return
+
+    await ctx.channel.send(f"📊 **Stats** {personality.random_emoji()}\n{metrics.render_text()}")
 
-async def show_help(message):
+async def show_help(ctx):
     help_text = f"""
 🌟 **Hiya! I'm your kawaii study buddy!** {personality.random_emoji()}
 
@@ -300,14 +414,14 @@ async def show_help(message):
 Ready to be productive together? {personality.random_emoji()}
     """
 
-    await message.channel.send(help_text)
+    await ctx.channel.send(help_text)
 
 # Run the bot
 if __name__ == "__main__":
     try:
         token = os.environ['DISCORD_BOT_TOKEN']
-        print("🚀 Starting bot...")
+        log.info("🚀 Starting bot...")
         bot.run(token)
     except KeyError:
-        print("❌ DISCORD_BOT_TOKEN secret not set!")
-        print("🔧 Add your bot token to Replit secrets!")
+        log.error("❌ DISCORD_BOT_TOKEN secret not set!")
+        log.error("🔧 Add your bot token to Replit secrets!")
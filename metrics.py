@@ -0,0 +1,180 @@
+import bisect
+import json
+import time
+from contextlib import contextmanager
+
+import botlog
+
+log = botlog.get_logger('metrics')
+
+# Bucket upper bounds in seconds: 0.1ms up to ~2 minutes, each 25% wider than the last
+BUCKET_BOUNDS = []
+_bound = 0.0001
+while _bound < 120:
+    BUCKET_BOUNDS.append(_bound)
+    _bound *= 1.25
+BUCKET_BOUNDS.append(float('inf'))
+
+class Histogram:
+    """Fixed-size latency histogram - recording is O(1)-ish and memory never grows"""
+
+    def __init__(self):
+        self.counts = [0] * len(BUCKET_BOUNDS)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(BUCKET_BOUNDS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, pct):
+        """Upper bound of the bucket holding the pct-th percentile (so within 25%)"""
+        if not self.count:
+            return 0.0
+        target = self.count * pct / 100
+        seen = 0
+        for bound, bucket_count in zip(BUCKET_BOUNDS, self.counts):
+            seen += bucket_count
+            if seen >= target:
+                return min(bound, self.max)
+        return self.max
+
+    def summary(self):
+        """p50/p95/p99 and friends, in milliseconds"""
+        return {
+            'count': self.count,
+            'mean_ms': round(self.total / self.count * 1000, 2) if self.count else 0.0,
+            'p50_ms': round(self.percentile(50) * 1000, 2),
+            'p95_ms': round(self.percentile(95) * 1000, 2),
+            'p99_ms': round(self.percentile(99) * 1000, 2),
+            'max_ms': round(self.max * 1000, 2),
+        }
+
+class Metrics:
+    """Named latency histograms for every stage we care about"""
+
+    def __init__(self):
+        self.histograms = {}
+        self.started = time.time()
+        self.runner = None
+
+    def observe(self, name, seconds):
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = Histogram()
+        histogram.observe(seconds)
+
+    @contextmanager
+    def timer(self, name):
+        """Time a block: `with metrics.timer('feature.pomodoro.handle'):`"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def snapshot(self):
+        return {
+            'uptime_s': round(time.time() - self.started),
+            'stages': {name: histogram.summary() for name, histogram in sorted(self.histograms.items())},
+        }
+
+    def render_text(self):
+        """Readable table for the stats DM"""
+        snapshot = self.snapshot()
+        if not snapshot['stages']:
+            return "No measurements yet!"
+
+        lines = [f"Uptime: {snapshot['uptime_s'] // 60} min", "```"]
+        lines.append(f"{'stage':<34}{'n':>6}{'p50':>9}{'p95':>9}{'p99':>9}")
+        for name, summary in snapshot['stages'].items():
+            lines.append(
+                f"{name[:33]:<34}{summary['count']:>6}"
+                f"{summary['p50_ms']:>9.1f}{summary['p95_ms']:>9.1f}{summary['p99_ms']:>9.1f}"
+            )
+        lines.append("```")
+        lines.append("*(all times in ms)*")
+        return "\n".join(lines)
+
+    async def start_server(self, host='127.0.0.1', port=8765):
+        """Serve the snapshot as JSON on http://host:port/metrics"""
+        if self.runner is not None or not port:
+            return
+
+        from aiohttp import web
+
+        async def handle_metrics(request):
+            return web.Response(text=json.dumps(self.snapshot(), indent=2), content_type='application/json')
+
+        app = web.Application()
+        app.router.add_get('/metrics', handle_metrics)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        await web.TCPSite(self.runner, host, port).start()
+        log.info("📊 Metrics endpoint up", url=f"http://{host}:{port}/metrics")
+
+    async def stop_server(self):
+        if self.runner is not None:
+            await self.runner.cleanup()
+            self.runner = None
+
+class TimedChannel:
+    """Wraps a channel and records how long the first reply took"""
+
+    def __init__(self, channel, started, name='reply.first_send'):
+        self.channel = channel
+        self.started = started
+        self.name = name
+        self.replied = False
+
+    async def send(self, *args, **kwargs):
+        # Outbox-only options mean nothing to a plain channel
+        kwargs.pop('own_message', None)
+        kwargs.pop('wait', None)
+        kwargs.pop('priority', None)
+        sent = await self.channel.send(*args, **kwargs)
+        self.mark_sent()
+        return sent
+
+    def mark_sent(self):
+        """Count the first reply as sent, e.g. when the outbox merged it into another send"""
+        if not self.replied:
+            self.replied = True
+            metrics.observe(self.name, time.perf_counter() - self.started)
+
+    def __getattr__(self, name):
+        return getattr(self.channel, name)
+
+def http_trace_config():
+    """aiohttp TraceConfig that times every outbound request
+
+    Pass trace_request_ctx={'metric': 'http.weather.geocode'} to session.get to name
+    the stage, otherwise it's filed under the host name.
+    """
+    import aiohttp
+
+    def metric_name(trace_ctx, params):
+        request_ctx = trace_ctx.trace_request_ctx or {}
+        return request_ctx.get('metric') or f"http.{params.url.host}"
+
+    async def on_request_start(session, trace_ctx, params):
+        trace_ctx.started = time.perf_counter()
+
+    async def on_request_end(session, trace_ctx, params):
+        metrics.observe(metric_name(trace_ctx, params), time.perf_counter() - trace_ctx.started)
+
+    async def on_request_exception(session, trace_ctx, params):
+        metrics.observe(metric_name(trace_ctx, params) + ".error", time.perf_counter() - trace_ctx.started)
+
+    trace_config = aiohttp.TraceConfig()
+    trace_config.on_request_start.append(on_request_start)
+    trace_config.on_request_end.append(on_request_end)
+    trace_config.on_request_exception.append(on_request_exception)
+    return trace_config
+
+# Shared instance, like the bot and personality in main.py
+metrics = Metrics()
@@ -1,9 +1,41 @@
 import asyncio
-import re
+import functools
+import os
 import random
+import time
 from datetime import datetime, timedelta
 import aiohttp
 
+import botlog
+from breaker import CircuitBreaker
+from cache import SourceCache
+from forecast import ForecastStore
+from metrics import http_trace_config
+from prewarm import Prewarmer
+from quotes import QuoteEngine
+from seen import SeenSets
+from singleflight import SingleFlight
+from storage import load_json, save_json
+
+log = botlog.get_logger('morning')
+
+GEOCODE_CACHE_FILE = 'geocode.json'
+CACHE_SNAPSHOT_FILE = 'digest_cache.json'
+SEEN_HEADLINES_FILE = 'seen_headlines.json'
+
+# Digest sections, in the order they show up
+SECTIONS = ('weather', 'news', 'stocks')
+
+# Everything we fetch (the forecast rides along with the weather section)
+SOURCES = SECTIONS + ('forecast',)
+
+# Connection pool settings for the shared HTTP session
+HTTP_POOL_LIMIT = 20          # open connections overall
+HTTP_POOL_PER_HOST = 4        # ...and to any one provider
+HTTP_KEEPALIVE = 60           # seconds an idle connection stays open for reuse
+HTTP_DNS_CACHE_TTL = 300      # seconds to remember DNS answers
+HTTP_TIMEOUT = 15             # seconds for a whole request
+
 class MorningDigest:
     """Manual morning digest with weather, news, and stocks"""
 
@@ -15,6 +47,11 @@ class MorningDigest:
         self.config = {
             "location": "Santa Rosa,CA,US",       # Try this format first!
 
+            # Where the APIs live - point these at standin.py to run offline
+            "weather_api_url": os.environ.get('OPENWEATHER_BASE_URL', "https://api.openweathermap.org"),
+            "news_api_url": os.environ.get('NEWS_API_BASE_URL', "https://newsapi.org"),
+            "stock_api_url": os.environ.get('STOCK_API_BASE_URL', "https://www.alphavantage.co"),
+
             # Weather settings
             "weather_units": "imperial",        # imperial = Fahrenheit, metric = Celsius
             "rain_threshold": 30,              # % chance of rain to recommend umbrella
@@ -35,6 +72,8 @@ class MorningDigest:
                 "science"
             ],
             "max_news_articles": 5,
+            "news_link_previews": False,       # True = one message per article (more API calls)
+            "news_hedge_delay": 1.5,           # Seconds before also trying the next query strategy
 
             # Stock tracking
             "stocks": [
@@ -46,8 +85,67 @@ class MorningDigest:
                 # Add your favorite stocks here!
             ],
             "stock_change_threshold": 2.0,     # Only show if change > 2%
+            "stock_requests_per_minute": 5,    # Alpha Vantage free tier quota
+            "stock_ttl_market_hours": 60,      # Seconds a quote stays fresh while trading
+            "stock_ttl_closed": 30 * 60,       # ...and while the market is closed
+
+            # How long (seconds) fetched data is reused before it gets refreshed
+            "cache_ttls": {"weather": 10 * 60, "forecast": 60 * 60, "news": 30 * 60, "stocks": 60},
+            # ...and how old it can get before we wait for fresh data instead
+            # (it's still shown, marked as old, if the provider is down)
+            "cache_max_stale": {"weather": 2 * 3600, "forecast": 12 * 3600, "news": 24 * 3600, "stocks": 12 * 3600},
+
+            # Fetch everything a bit before you get up (None turns it off)
+            "wake_time": "07:30",              # 24h local time
+            "prewarm_minutes": 10,
+
+            # Stop asking a provider after this many failures in a row, then
+            # check back after the backoff (doubling each time it's still down)
+            "breaker_threshold": 3,
+            "breaker_backoff": 30,
+
+            # How long (seconds) the full digest waits on each section
+            "digest_timeouts": {"weather": 8, "news": 10, "stocks": 12},
         }
 
+        # Where the location lives on the map never changes, so don't ask every time
+        self.geocode_cache = load_json(GEOCODE_CACHE_FILE, {})
+
+        # Quotes are fetched side by side but never faster than the API allows
+        self.quotes = QuoteEngine(
+            self.fetch_quote,
+            requests_per_minute=self.config['stock_requests_per_minute'],
+            burst=self.config['stock_requests_per_minute'],
+            market_ttl=self.config['stock_ttl_market_hours'],
+            closed_ttl=self.config['stock_ttl_closed'],
+        )
+
+        # One circuit breaker per provider, so a broken one fails fast
+        self.breakers = {
+            name: CircuitBreaker(name, threshold=self.config['breaker_threshold'], backoff=self.config['breaker_backoff'])
+            for name in SOURCES
+        }
+
+        # Identical requests that overlap share one trip to the provider
+        self.flights = SingleFlight('morning')
+
+        # Recent answers get reused (and refreshed in the background once stale)
+        self.cache = SourceCache(self.config['cache_ttls'], self.config['cache_max_stale'],
+                                 snapshot_file=CACHE_SNAPSHOT_FILE)
+
+        # Headlines already sent to each user, so their repeat digests only show what's new
+        self.seen_headlines = SeenSets(max_items=2000, snapshot_file=SEEN_HEADLINES_FILE)
+
+        # Latest forecast, parsed (see get_forecast)
+        self.forecast_data = None
+        self.forecast = None
+
+        # Gets the digest ready before the alarm goes off
+        self.prewarmer = Prewarmer(self.prewarm, self.config['wake_time'], self.config['prewarm_minutes'])
+
+        # One pooled HTTP session for every provider - opened by start(), closed by close()
+        self.session = None
+
         # Manual trigger patterns
         self.morning_patterns = [
             r"morning digest",
@@ -61,52 +159,83 @@ class MorningDigest:
             r"morning brief",
         ]
 
-    async def can_handle(self, message):
-        """Check if this feature can handle the message"""
-        keywords = [
+        # Full digest wins over the single sections, same as before
+        self.intents = (
+            [("digest", pattern) for pattern in self.morning_patterns] +
+            [
+                # Questions the forecast can answer - before plain "weather"
+                ("rain_at", r"\b(?:will it|is it going to|gonna|going to) rain\b(?:.*?\b(?:at|around|by) (\d{1,2})(?::(\d{2}))? ?(am|pm)?\b)?"),
+                ("coldest", r"\bcoldest (?:hour|part)\b|\bwhen(?:'s| is| will) it (?:be )?(?:the )?coldest\b"),
+                ("warmest", r"\b(?:warmest|hottest) (?:hour|part)\b|\bwhen(?:'s| is| will) it (?:be )?(?:the )?(?:warmest|hottest)\b"),
+                ("weather", r"weather|temperature|rain|forecast"),
+                ("news", r"news|headlines|articles"),
+                ("stocks", r"stocks|market|shares|portfolio"),
+            ]
+        )
+
+        # Trigger keywords - these go into the shared keyword index
+        self.keywords = [
             'morning', 'digest', 'routine', 'briefing', 'weather', 
-            'news', 'stocks', 'wake', 'daily', 'update', 'summary'
+            'news', 'stocks', 'wake', 'daily', 'update', 'summary',
+            'forecast', 'will it rain', 'gonna rain', 'going to rain', 'coldest', 'warmest', 'hottest'
         ]
 
-        return any(keyword in message.lower() for keyword in keywords)
+    async def can_handle(self, ctx):
+        """Check if this feature can handle the message"""
+        # The keyword index already scanned the message for us
+        return 'morning' in ctx.keyword_hits
 
-    async def handle(self, message):
+    async def handle(self, ctx):
         """Handle morning digest related messages"""
-        content = message.content.lower().strip()
+        intent = ctx.intents.best('morning')
 
         # Check for full morning digest
-        for pattern in self.morning_patterns:
-            if re.search(pattern, content):
-                await self.send_morning_digest(message)
-                return
+        if intent and intent.name == "digest":
+            await self.send_morning_digest(ctx)
+            return
+
+        # Forecast questions get answered from the stored forecast
+        if intent and intent.name == "rain_at":
+            await self.send_rain_answer(ctx, intent)
+            return
+
+        if intent and intent.name in ("coldest", "warmest"):
+            await self.send_temperature_answer(ctx, intent.name)
+            return
 
         # Check for individual components
-        if any(word in content for word in ['weather', 'temperature', 'rain', 'forecast']):
-            await self.send_weather_update(message)
+        if intent and intent.name == "weather":
+            await self.send_weather_update(ctx)
             return
 
-        if any(word in content for word in ['news', 'headlines', 'articles']):
-            await self.send_news_update(message)
+        if intent and intent.name == "news":
+            await self.send_news_update(ctx)
             return
 
-        if any(word in content for word in ['stocks', 'market', 'shares', 'portfolio']):
-            await self.send_stock_update(message)
+        if intent and intent.name == "stocks":
+            await self.send_stock_update(ctx)
             return
 
         # Default help response
-        await self.send_help_message(message)
+        await self.send_help_message(ctx)
 
     def get_help(self):
         """Return help text for this feature"""
         return """**🌅 Morning Digest:**
 • **Full digest:** "morning digest", "daily briefing", "good morning"
 • **Weather only:** "weather update", "forecast"
+• **Forecast questions:** "will it rain at 5pm?", "coldest hour today"
 • **News only:** "tech news", "daily headlines" 
 • **Stocks only:** "stock update", "market check"
 """
 
-    async def send_morning_digest(self, message):
+    async def send_morning_digest(self, ctx):
         """Send the full morning digest"""
+        # Ask all three providers right away - the digest takes as long as the
+        # slowest one instead of all of them added up
+        started = time.monotonic()
+        fetches = {name: asyncio.create_task(self.fetch_section(name)) for name in SECTIONS}
+
         # Morning greeting
         greetings = [
             f"Good morning senpai! {self.personality.random_emoji()} Here's your daily briefing~",
@@ -116,16 +245,27 @@ class MorningDigest:
         ]
         greeting = random.choice(greetings)
 
-        await message.channel.send(greeting)
-        await asyncio.sleep(1)
+        await ctx.channel.send(greeting)
+        self.prewarmer.record_request()
 
-        # Send each section
         try:
-            await self.send_weather_update(message)
-            await asyncio.sleep(2)
-            await self.send_news_update(message) 
-            await asyncio.sleep(2)
-            await self.send_stock_update(message)
+            # One placeholder per section, in the usual order - each gets edited into
+            # its section as soon as that data is in, whichever finishes first
+            placeholders = {}
+            for name in SECTIONS:
+                placeholders[name] = await ctx.channel.send(self.loading_text(name), own_message=True, wait=True)
+
+            async def fill(name):
+                timeout = self.config['digest_timeouts'][name] - (time.monotonic() - started)
+                try:
+                    data = await asyncio.wait_for(fetches[name], timeout=max(timeout, 0))
+                except asyncio.TimeoutError:
+                    log.warning("⏰ Digest section timed out", section=name, timeout=self.config['digest_timeouts'][name])
+                    await self.show(ctx, placeholders[name], self.section_placeholder(name))
+                    return
+                await self.render_section(ctx, placeholders[name], name, data)
+
+            await asyncio.gather(*(fill(name) for name in SECTIONS))
 
             # Encouraging wrap-up
             wrap_ups = [
@@ -134,22 +274,151 @@ class MorningDigest:
                 f"All set for today! {self.personality.random_emoji()} Make it count!",
                 f"Stay awesome! {self.personality.random_emoji()} Today's gonna be great!",
             ]
-            await asyncio.sleep(1)
-            await message.channel.send(random.choice(wrap_ups))
-
-        except Exception as e:
-            await message.channel.send(f"Oops! {self.personality.random_emoji()} Had trouble getting some info, but you're still awesome!")
-            print(f"❌ Morning digest error: {e}")
+            await ctx.channel.send(random.choice(wrap_ups))
+
+        except Exception:
+            await ctx.channel.send(f"Oops! {self.personality.random_emoji()} Had trouble getting some info, but you're still awesome!")
+            log.exception("❌ Morning digest error")
+        finally:
+            for task in fetches.values():
+                task.cancel()
+
+    def loading_text(self, name):
+        """The placeholder a section shows while its data is on the way"""
+        loading = {
+            'weather': f"Getting weather data... {self.personality.random_emoji()}",
+            'news': f"Fetching latest news... {self.personality.random_emoji()}",
+            'stocks': f"Checking your portfolio... {self.personality.random_emoji()}",
+        }
+        return loading[name]
+
+    def section_placeholder(self, name):
+        """What goes in a digest section whose provider was too slow"""
+        placeholders = {
+            'weather': f"🌤️ Weather is taking forever today... {self.personality.get_error_emoji()} Ask me again in a bit!",
+            'news': f"📰 The news is running late! {self.personality.get_error_emoji()} Try \"tech news\" in a minute~",
+            'stocks': f"📈 The market data is slow right now {self.personality.get_error_emoji()} Try \"stock update\" later!",
+        }
+        return placeholders[name]
 
-    async def send_weather_update(self, message):
+    async def send_weather_update(self, ctx):
         """Send weather information"""
-        loading_msg = await message.channel.send(f"Getting weather data... {self.personality.random_emoji()}")
+        loading_msg = await ctx.channel.send(self.loading_text('weather'), own_message=True, wait=True)
+        await self.render_section(ctx, loading_msg, 'weather', await self.fetch_section('weather'))
 
+    async def send_news_update(self, ctx):
+        """Send personalized news digest"""
+        loading_msg = await ctx.channel.send(self.loading_text('news'), own_message=True, wait=True)
+        await self.render_section(ctx, loading_msg, 'news', await self.fetch('news'))
+
+    async def send_stock_update(self, ctx):
+        """Send stock market update"""
+        loading_msg = await ctx.channel.send(self.loading_text('stocks'), own_message=True, wait=True)
+        await self.render_section(ctx, loading_msg, 'stocks', await self.fetch('stocks'))
+
+    async def send_rain_answer(self, ctx, intent):
+        """'will it rain at 5pm?' - answered from the stored forecast"""
+        forecast = await self.get_forecast()
+        if not forecast:
+            await ctx.channel.send(f"I can't see the forecast right now! {self.personality.get_error_emoji()} Try again in a bit?")
+            return
+
+        now = forecast.now()
+        if intent.group(1):
+            hour, minute, half = int(intent.group(1)), int(intent.group(2) or 0), intent.group(3)
+            if half == "pm" and hour < 12:
+                hour += 12
+            elif half == "am" and hour == 12:
+                hour = 0
+            elif half is None and 1 <= hour <= 7:
+                hour += 12  # "at 5" almost always means the afternoon
+            if hour > 23 or minute > 59:
+                await ctx.channel.send(f"That's not a time I know! {self.personality.get_error_emoji()}")
+                return
+
+            when = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+            if when < now - timedelta(hours=1):
+                when += timedelta(days=1)
+            slot = forecast.slot_at(when)
+            if slot is None:
+                await ctx.channel.send(f"That's past what my forecast can see! {self.personality.random_emoji()}")
+                return
+            chance, label = forecast.rain[slot], f"around {forecast.hour_label(slot)}"
+        else:
+            chance, slot = forecast.max_rain(forecast.rest_of_day(now))
+            if slot is None:
+                await ctx.channel.send(f"Today's almost over! {self.personality.random_emoji()} Ask me about a specific time?")
+                return
+            label = f"later today (around {forecast.hour_label(slot)})"
+
+        if chance > self.config['rain_threshold']:
+            answer = f"☔ Probably! {chance:.0f}% chance of rain {label}. Bring an umbrella!"
+        elif chance > 0:
+            answer = f"🌤️ Only {chance:.0f}% chance of rain {label}, you should be fine!"
+        else:
+            answer = f"☀️ Looks dry {label}!"
+        await ctx.channel.send(f"{answer} {self.personality.random_emoji()}")
+
+    async def send_temperature_answer(self, ctx, which):
+        """'coldest hour today' / 'warmest hour today' - from the stored forecast"""
+        forecast = await self.get_forecast()
+        if not forecast:
+            await ctx.channel.send(f"I can't see the forecast right now! {self.personality.get_error_emoji()} Try again in a bit?")
+            return
+
+        now = forecast.now()
+        slots = forecast.rest_of_day(now)
+        when = "today"
+        if not slots:
+            # Late at night - look at the next day instead
+            slots = forecast.span(now, now + timedelta(days=1))
+            when = "in the next 24 hours"
+
+        if which == "coldest":
+            temp, slot = forecast.coldest(slots)
+            emoji, word = "🥶", "Coldest"
+        else:
+            temp, slot = forecast.warmest(slots)
+            emoji, word = "🥵", "Warmest"
+
+        if slot is None:
+            await ctx.channel.send(f"My forecast doesn't reach that far! {self.personality.get_error_emoji()}")
+            return
+        await ctx.channel.send(f"{emoji} {word} it gets {when} is **{temp:.0f}°F** around {forecast.hour_label(slot)}! {self.personality.random_emoji()}")
+
+    async def show(self, ctx, message, text):
+        """Turn a placeholder message into `text` (or just send it if we can't edit)"""
+        if message is not None:
+            try:
+                await message.edit(content=text)
+                return
+            except Exception:
+                log.warning("⚠️ Could not edit placeholder, sending instead")
+        await ctx.channel.send(text)
+
+    async def render_section(self, ctx, message, name, data):
+        """Edit a section's placeholder into the finished section"""
+        note = self.stale_note(name)
+        if name == 'weather':
+            await self.show(ctx, message, self.weather_text(*data) + note)
+        elif name == 'news':
+            await self.render_news(ctx, message, data, note)
+        else:
+            await self.show(ctx, message, self.stock_text(data) + note)
+
+    def stale_note(self, name):
+        """A warning line for a section showing old data because the refresh failed"""
+        sources = ('weather', 'forecast') if name == 'weather' else (name,)
+        ages = [self.cache.age(source) for source in sources if self.cache.too_stale(source)]
+        if not ages:
+            return ""
+        return f"\n⚠️ *Couldn't refresh this, it's from {format_age(max(ages))} ago*"
+
+    def weather_text(self, weather_data, forecast=None):
+        """The weather section, from current conditions and (if we have it) the forecast"""
         try:
-            weather_data = await self.get_weather_data()
             if not weather_data:
-                await message.channel.send(f"Couldn't get weather data! {self.personality.get_error_emoji()} Check the console for error details.")
-                return
+                return f"Couldn't get weather data! {self.personality.get_error_emoji()} Check the console for error details."
 
             # Extract weather info
             temp = weather_data['main']['temp']
@@ -160,7 +429,7 @@ class MorningDigest:
             # Get appropriate emoji for temperature
             weather_emoji = self.personality.get_weather_emoji(temp)
 
-            # Check for rain
+            # Check for rain (only a guess from current conditions if there's no forecast)
             rain_chance = 0
             if 'rain' in weather_data:
                 rain_chance = weather_data['rain'].get('1h', 0) * 10  # Convert mm to rough %
@@ -173,13 +442,22 @@ class MorningDigest:
             weather_msg += f"• **{description}**\n"
             weather_msg += f"• **Humidity:** {humidity}%"
 
-            # Recommendations
+            # Recommendations - from the rest of today's forecast when we have it
             recommendations = []
-            if rain_chance > self.config['rain_threshold']:
-                recommendations.append(f"☔ Bring an umbrella! ~{rain_chance:.0f}% chance of rain")
+            if forecast:
+                todays = forecast.recommendations(self.config['rain_threshold'], self.config['cold_threshold'])
+                if 'umbrella' in todays:
+                    chance, slot = todays['umbrella']
+                    recommendations.append(f"☔ Bring an umbrella! {chance:.0f}% chance of rain around {forecast.hour_label(slot)}")
+                if 'jacket' in todays:
+                    low, slot = todays['jacket']
+                    recommendations.append(f"🧥 Grab a jacket! Down to {low:.0f}°F around {forecast.hour_label(slot)}")
+            else:
+                if rain_chance > self.config['rain_threshold']:
+                    recommendations.append(f"☔ Bring an umbrella! ~{rain_chance:.0f}% chance of rain")
 
-            if temp < self.config['cold_threshold']:
-                recommendations.append(f"🧥 Grab a jacket! It's chilly today")
+                if temp < self.config['cold_threshold']:
+                    recommendations.append(f"🧥 Grab a jacket! It's chilly today")
 
             if temp > 80:
                 recommendations.append(f"🌞 Perfect weather! Maybe shorts today?")
@@ -189,63 +467,78 @@ class MorningDigest:
 
             weather_msg += f"\n\nHave a great day out there! {weather_emoji}"
 
-            await message.channel.send(weather_msg)
+            return weather_msg
 
-        except Exception as e:
-            await message.channel.send(f"Weather check failed! {self.personality.get_error_emoji()} But every day is a good day with you!")
-            print(f"❌ Weather error: {e}")
-
-    async def send_news_update(self, message):
-        """Send personalized news digest"""
-        loading_msg = await message.channel.send(f"Fetching latest news... {self.personality.random_emoji()}")
+        except Exception:
+            log.exception("❌ Weather error")
+            return f"Weather check failed! {self.personality.get_error_emoji()} But every day is a good day with you!"
 
+    async def render_news(self, ctx, message, news_data, note=""):
+        """Edit the news placeholder into the headlines"""
         try:
-            news_data = await self.get_news_data()
             if not news_data:
-                await message.channel.send(f"Couldn't get news today! {self.personality.get_error_emoji()} Check the console for error details.")
+                await self.show(ctx, message, f"Couldn't get news today! {self.personality.get_error_emoji()} Check the console for error details.")
                 return
 
-            # Send header
-            await message.channel.send(f"📰 **Your Daily Tech Digest** {self.personality.random_emoji()}")
-
-            # Send each article as its own message for clean preview layout
-            for i, article in enumerate(news_data[:self.config['max_news_articles']], 1):
-                title = article.get('title', 'No title')
-                source = article.get('source', {}).get('name', 'Unknown')
-                url = article.get('url', '')
-
-                # Truncate long titles
-                if len(title) > 100:
-                    title = title[:97] + "..."
-
-                # Create individual message for each article
-                article_msg = f"**{i}.** {title}\n"
-                article_msg += f"*Source: {source}*"
-
-                if url:
-                    article_msg += f"\n{url}"
-
-                await message.channel.send(article_msg)
-
-                # Small delay between articles for readability
-                await asyncio.sleep(0.5)
-
-            # Send footer
-            await message.channel.send(f"Stay informed! {self.personality.random_emoji()}")
-
-        except Exception as e:
-            await message.channel.send(f"News update failed! {self.personality.get_error_emoji()} But you're always my top story!")
-            print(f"❌ News error: {e}")
-
-    async def send_stock_update(self, message):
-        """Send stock market update"""
-        loading_msg = await message.channel.send(f"Checking your portfolio... {self.personality.random_emoji()}")
-
+            # Don't repeat headlines from this user's earlier digests
+            seen = self.seen_headlines.get(ctx.author.id)
+            fresh_articles = [article for article in news_data if not self.seen_article(article, seen)]
+            if not fresh_articles:
+                await self.show(ctx, message, f"📰 No new headlines since last time! {self.personality.random_emoji()} You're all caught up~")
+                return
+            fresh_articles = fresh_articles[:self.config['max_news_articles']]
+
+            header = f"📰 **Your Daily Tech Digest** {self.personality.random_emoji()}{note}"
+            footer = f"Stay informed! {self.personality.random_emoji()}"
+
+            if self.config['news_link_previews']:
+                # Each link preview sitting right under its own article needs
+                # separate messages, so only the header goes in the placeholder
+                await self.show(ctx, message, header)
+                for i, article in enumerate(fresh_articles, 1):
+                    await ctx.channel.send(self.article_text(i, article), own_message=True)
+                await ctx.channel.send(footer)
+            else:
+                # NewsAPI hands us the whole list at once, so it's one edit
+                lines = [header] + [self.article_text(i, article) for i, article in enumerate(fresh_articles, 1)]
+                lines.append(footer)
+                await self.show(ctx, message, "\n\n".join(lines))
+
+            for article in fresh_articles:
+                seen.add(article_url_key(article))
+                seen.add(article_title_key(article))
+            self.seen_headlines.save()
+
+        except Exception:
+            await self.show(ctx, message, f"News update failed! {self.personality.get_error_emoji()} But you're always my top story!")
+            log.exception("❌ News error")
+
+    def article_text(self, i, article):
+        """One numbered headline with its source and link"""
+        title = article.get('title', 'No title')
+        source = article.get('source', {}).get('name', 'Unknown')
+        url = article.get('url', '')
+
+        # Truncate long titles
+        if len(title) > 100:
+            title = title[:97] + "..."
+
+        article_msg = f"**{i}.** {title}\n"
+        article_msg += f"*Source: {source}*"
+
+        if url:
+            article_msg += f"\n{url}"
+        return article_msg
+
+    def seen_article(self, article, seen):
+        """Shown before? Same link, or the same headline from another outlet"""
+        return article_url_key(article) in seen or article_title_key(article) in seen
+
+    def stock_text(self, stock_data):
+        """The portfolio section, from fetched quotes"""
         try:
-            stock_data = await self.get_stock_data()
             if not stock_data:
-                await message.channel.send(f"Couldn't get stock data! {self.personality.get_error_emoji()} Check the console for error details.")
-                return
+                return f"Couldn't get stock data! {self.personality.get_error_emoji()} Check the console for error details."
 
             stock_msg = f"📈 **Your Portfolio Check** {self.personality.random_emoji()}\n\n"
 
@@ -267,13 +560,13 @@ class MorningDigest:
 
             stock_msg += f"\n\nKeep investing in yourself! {self.personality.random_emoji()}"
 
-            await message.channel.send(stock_msg)
+            return stock_msg
 
-        except Exception as e:
-            await message.channel.send(f"Stock check failed! {self.personality.get_error_emoji()} But you're always a valuable investment!")
-            print(f"❌ Stock error: {e}")
+        except Exception:
+            log.exception("❌ Stock error")
+            return f"Stock check failed! {self.personality.get_error_emoji()} But you're always a valuable investment!"
 
-    async def send_help_message(self, message):
+    async def send_help_message(self, ctx):
         """Send help for morning digest"""
         help_msg = f"""
 🌅 **Morning Digest Help** {self.personality.random_emoji()}
@@ -292,90 +585,231 @@ class MorningDigest:
 Want to customize? Edit the config in morning.py! {self.personality.random_emoji()}
         """
 
-        await message.channel.send(help_msg)
+        await ctx.channel.send(help_msg)
+
+    async def start(self):
+        """Open the shared HTTP session (call from the bot's setup hook)"""
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=HTTP_POOL_LIMIT,
+                limit_per_host=HTTP_POOL_PER_HOST,
+                keepalive_timeout=HTTP_KEEPALIVE,
+                ttl_dns_cache=HTTP_DNS_CACHE_TTL,
+            )
+            self.session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=HTTP_TIMEOUT),
+                trace_configs=[http_trace_config()],
+            )
+            log.debug("🔌 HTTP session opened")
+        return self.session
+
+    async def close(self):
+        """Close the shared HTTP session (call on shutdown)"""
+        self.prewarmer.stop()
+        if self.session is not None and not self.session.closed:
+            await self.session.close()
+            log.debug("🔌 HTTP session closed")
+        self.session = None
+
+    async def http(self):
+        """The shared HTTP session - opened on first use if start() wasn't called"""
+        if self.session is None or self.session.closed:
+            return await self.start()
+        return self.session
+
+    def source(self, name):
+        """(fetcher, cache key) for one section - the key is what the data depends on"""
+        if name == 'weather':
+            fetcher, key = self.get_weather_data, [self.config['location'], self.config['weather_units']]
+        elif name == 'forecast':
+            fetcher, key = self.get_forecast_data, [self.config['location'], self.config['weather_units']]
+        elif name == 'news':
+            fetcher, key = self.get_news_data, [self.config['news_sources'], self.config['news_topics']]
+        elif name == 'stocks':
+            fetcher, key = self.get_stock_data, self.config['stocks']
+        else:
+            raise ValueError(f"Unknown source: {name}")
+
+        # A provider that keeps failing gets skipped for a while (the cache covers for it)
+        return functools.partial(self.breakers[name].call, fetcher), key
+
+    async def fetch(self, name):
+        """Data for one section ('weather', 'news' or 'stocks'), through the cache"""
+        fetcher, key = self.source(name)
+        return await self.cache.get(name, fetcher, key)
+
+    async def fetch_section(self, name):
+        """Everything one digest section needs - weather comes with the forecast"""
+        if name == 'weather':
+            return await asyncio.gather(self.fetch('weather'), self.get_forecast())
+        return await self.fetch(name)
+
+    async def get_forecast(self):
+        """The forecast as a ForecastStore (rebuilt only when the cached data changes)"""
+        data = await self.fetch('forecast')
+        if not data:
+            return None
+        if data is not self.forecast_data:
+            self.forecast_data = data
+            self.forecast = ForecastStore.from_api(data)
+        return self.forecast
+
+    async def prewarm(self):
+        """Refresh every section in the cache so the morning digest is instant"""
+        refreshes = []
+        for name in SOURCES:
+            fetcher, key = self.source(name)
+            refreshes.append(self.cache.refresh(name, fetcher, key))
+        await asyncio.gather(*refreshes, return_exceptions=True)
 
     # API Methods - Real implementations!
+    async def get_coordinates(self, session, api_key):
+        """lat/lon for the configured location - geocoded once, then remembered on disk"""
+        location = self.config['location']
+        cached = self.geocode_cache.get(location)
+        if cached:
+            log.debug("📍 Using cached coordinates", location=location, query=cached['query'])
+            return cached
+
+        # Weather and forecast both need this on a cold start - only geocode once
+        return await self.flights.do(('geocode', location), lambda: self.geocode(session, api_key, location))
+
+    async def geocode(self, session, api_key, location):
+        """Try spellings of the location until the geocoding API knows one"""
+        # Try multiple location formats for better success
+        location_formats = [
+            location,                                   # Original format
+            location.replace(', ', ','),                # Remove spaces
+            location.replace(',CA,US', ',California,US'), # Full state name
+            'Santa Rosa,California,US',                 # Explicit format
+            'Santa Rosa,CA',                           # Simple format
+            'Santa Rosa'                               # Just city name
+        ]
+
+        geo_data = None
+        successful_location = None
+
+        # Try each location format until one works
+        for location_attempt in location_formats:
+            log.debug("🗺️ Trying location format", location=location_attempt)
+
+            geocoding_url = f"{self.config['weather_api_url']}/geo/1.0/direct"
+            geo_params = {
+                'q': location_attempt,
+                'limit': 1,
+                'appid': api_key
+            }
+
+            async with session.get(geocoding_url, params=geo_params,
+                                   trace_request_ctx={'metric': 'http.weather.geocode'}) as geo_response:
+                if geo_response.status == 200:
+                    temp_geo_data = await geo_response.json()
+                    if temp_geo_data:
+                        geo_data = temp_geo_data
+                        successful_location = location_attempt
+                        log.debug("✅ Found location", location=location_attempt)
+                        break
+                else:
+                    log.warning("❌ Geocoding failed", location=location_attempt, status=geo_response.status)
+                    # Bad key, rate limited or down - other spellings won't fare any better
+                    if geo_response.status in (401, 429) or geo_response.status >= 500:
+                        break
+
+        if not geo_data:
+            log.error("❌ Could not find location with any format!", location=location)
+            return None
+
+        coordinates = {
+            'query': successful_location,
+            'lat': geo_data[0]['lat'],
+            'lon': geo_data[0]['lon'],
+            'name': geo_data[0].get('name', 'Unknown'),
+        }
+        log.debug("📍 Found coordinates", name=coordinates['name'], lat=coordinates['lat'], lon=coordinates['lon'])
+
+        # Only the current location is kept, so changing it in the config is what
+        # throws the old answer away
+        self.geocode_cache = {location: coordinates}
+        save_json(GEOCODE_CACHE_FILE, self.geocode_cache)
+        return coordinates
+
     async def get_weather_data(self):
         """Get weather data from OpenWeatherMap API"""
         import os
 
         api_key = os.environ.get('OPENWEATHER_API_KEY')
         if not api_key:
-            print("❌ OPENWEATHER_API_KEY not set in secrets!")
+            log.error("❌ OPENWEATHER_API_KEY not set in secrets!")
             return None
 
-        print(f"🌤️ Using weather API key: {api_key[:8]}...")
-
         try:
-            # Try multiple location formats for better success
-            location_formats = [
-                self.config['location'],                    # Original format
-                self.config['location'].replace(', ', ','), # Remove spaces
-                self.config['location'].replace(',CA,US', ',California,US'), # Full state name
-                'Santa Rosa,California,US',                 # Explicit format
-                'Santa Rosa,CA',                           # Simple format
-                'Santa Rosa'                               # Just city name
-            ]
-
-            geo_data = None
-            successful_location = None
-
-            async with aiohttp.ClientSession() as session:
-                # Try each location format until one works
-                for location_attempt in location_formats:
-                    print(f"🗺️ Trying location format: {location_attempt}")
-
-                    geocoding_url = f"http://api.openweathermap.org/geo/1.0/direct"
-                    geo_params = {
-                        'q': location_attempt,
-                        'limit': 1,
-                        'appid': api_key
-                    }
-
-                    async with session.get(geocoding_url, params=geo_params) as geo_response:
-                        if geo_response.status == 200:
-                            temp_geo_data = await geo_response.json()
-                            if temp_geo_data:
-                                geo_data = temp_geo_data
-                                successful_location = location_attempt
-                                print(f"✅ Found location with format: {location_attempt}")
-                                break
-                        else:
-                            print(f"❌ Failed for {location_attempt}: {geo_response.status}")
-
-                if not geo_data:
-                    print(f"❌ Could not find location with any format!")
+            session = await self.http()
+            coordinates = await self.get_coordinates(session, api_key)
+            if not coordinates:
+                return None
+            lat, lon = coordinates['lat'], coordinates['lon']
+
+            # Get weather data
+            weather_url = f"{self.config['weather_api_url']}/data/2.5/weather"
+            weather_params = {
+                'lat': lat,
+                'lon': lon,
+                'appid': api_key,
+                'units': self.config['weather_units']
+            }
+
+            async with session.get(weather_url, params=weather_params,
+                                   trace_request_ctx={'metric': 'http.weather.current'}) as weather_response:
+                if weather_response.status != 200:
+                    error_text = await weather_response.text()
+                    log.warning("❌ Weather API failed", status=weather_response.status, body=error_text)
                     return None
 
-                lat, lon = geo_data[0]['lat'], geo_data[0]['lon']
-                location_name = geo_data[0].get('name', 'Unknown')
-                print(f"📍 Found: {location_name} at coordinates: {lat}, {lon}")
-
-                # Get weather data
-                weather_url = "https://api.openweathermap.org/data/2.5/weather"
-                weather_params = {
-                    'lat': lat,
-                    'lon': lon,
-                    'appid': api_key,
-                    'units': self.config['weather_units']
-                }
+                weather_data = await weather_response.json()
+                log.debug("✅ Weather data received", status=weather_response.status)
+                return weather_data
 
-                print(f"🌤️ Getting weather data...")
+        except Exception:
+            log.exception("❌ Weather API error")
+            return None
 
-                async with session.get(weather_url, params=weather_params) as weather_response:
-                    print(f"🌤️ Weather response status: {weather_response.status}")
+    async def get_forecast_data(self):
+        """Get the 5 day / 3 hour forecast from OpenWeatherMap API"""
+        import os
 
-                    if weather_response.status != 200:
-                        error_text = await weather_response.text()
-                        print(f"❌ Weather API failed: {weather_response.status} - {error_text}")
-                        return None
+        api_key = os.environ.get('OPENWEATHER_API_KEY')
+        if not api_key:
+            log.error("❌ OPENWEATHER_API_KEY not set in secrets!")
+            return None
 
-                    weather_data = await weather_response.json()
-                    print(f"✅ Weather data received successfully!")
-                    return weather_data
+        try:
+            session = await self.http()
+            coordinates = await self.get_coordinates(session, api_key)
+            if not coordinates:
+                return None
 
-        except Exception as e:
-            print(f"❌ Weather API error: {e}")
+            forecast_url = f"{self.config['weather_api_url']}/data/2.5/forecast"
+            forecast_params = {
+                'lat': coordinates['lat'],
+                'lon': coordinates['lon'],
+                'appid': api_key,
+                'units': self.config['weather_units']
+            }
+
+            async with session.get(forecast_url, params=forecast_params,
+                                   trace_request_ctx={'metric': 'http.weather.forecast'}) as forecast_response:
+                if forecast_response.status != 200:
+                    error_text = await forecast_response.text()
+                    log.warning("❌ Forecast API failed", status=forecast_response.status, body=error_text)
+                    return None
+
+                forecast_data = await forecast_response.json()
+                log.debug("✅ Forecast received", slots=len(forecast_data.get('list', [])))
+                return forecast_data
+
+        except Exception:
+            log.exception("❌ Forecast API error")
             return None
 
     async def get_news_data(self):
@@ -384,143 +818,180 @@ Want to customize? Edit the config in morning.py! {self.personality.random_emoji
 
         api_key = os.environ.get('NEWS_API_KEY')
         if not api_key:
-            print("❌ NEWS_API_KEY not set in secrets!")
+            log.error("❌ NEWS_API_KEY not set in secrets!")
             return None
 
-        print(f"📰 Using news API key: {api_key[:8]}...")
-
         try:
-            async with aiohttp.ClientSession() as session:
-                # Try a simpler query first - just get recent tech articles
-                news_url = "https://newsapi.org/v2/everything"
-
-                # Try multiple query strategies
-                query_attempts = [
-                    # Strategy 1: Just sources, no topic filter, last 7 days
-                    {
-                        'apiKey': api_key,
-                        'sources': ','.join(self.config['news_sources']),
-                        'sortBy': 'publishedAt',
-                        'language': 'en',
-                        'pageSize': 20,
-                        'from': (datetime.now() - timedelta(days=7)).strftime('%Y-%m-%d')
-                    },
-                    # Strategy 2: Just topic, no source filter
-                    {
-                        'apiKey': api_key,
-                        'q': 'technology',
-                        'sortBy': 'publishedAt',
-                        'language': 'en',
-                        'pageSize': 20,
-                        'from': (datetime.now() - timedelta(days=3)).strftime('%Y-%m-%d')
-                    },
-                    # Strategy 3: Very broad search
-                    {
-                        'apiKey': api_key,
-                        'q': 'tech',
-                        'sortBy': 'publishedAt',
-                        'language': 'en',
-                        'pageSize': 20,
-                        'from': (datetime.now() - timedelta(days=7)).strftime('%Y-%m-%d')
-                    }
-                ]
-
-                for i, params in enumerate(query_attempts):
-                    print(f"📰 Trying query strategy {i+1}...")
-                    print(f"📰 Params: {params}")
-
-                    async with session.get(news_url, params=params) as response:
-                        print(f"📰 Strategy {i+1} response status: {response.status}")
-
-                        if response.status != 200:
-                            error_text = await response.text()
-                            print(f"❌ Strategy {i+1} failed: {response.status} - {error_text}")
-                            continue
-
-                        data = await response.json()
-                        articles = data.get('articles', [])
-                        print(f"📰 Strategy {i+1} found {len(articles)} articles")
-
-                        if articles:
-                            # Found articles! Process them
-                            good_articles = []
-                            for j, article in enumerate(articles):
-                                title = article.get('title', 'No title')
-                                url = article.get('url', '')
-
-                                if (article.get('title') and 
-                                    article.get('url') and 
-                                    article.get('title') != '[Removed]' and
-                                    len(good_articles) < self.config['max_news_articles']):
-                                    good_articles.append(article)
-                                    print(f"✅ Added: {title[:50]}...")
-
-                            print(f"✅ Strategy {i+1} success! Returning {len(good_articles)} articles")
+            session = await self.http()
+            # Try a simpler query first - just get recent tech articles
+            news_url = f"{self.config['news_api_url']}/v2/everything"
+
+            # Try multiple query strategies
+            query_attempts = [
+                # Strategy 1: Just sources, no topic filter, last 7 days
+                {
+                    'apiKey': api_key,
+                    'sources': ','.join(self.config['news_sources']),
+                    'sortBy': 'publishedAt',
+                    'language': 'en',
+                    'pageSize': 20,
+                    'from': (datetime.now() - timedelta(days=7)).strftime('%Y-%m-%d')
+                },
+                # Strategy 2: Just topic, no source filter
+                {
+                    'apiKey': api_key,
+                    'q': 'technology',
+                    'sortBy': 'publishedAt',
+                    'language': 'en',
+                    'pageSize': 20,
+                    'from': (datetime.now() - timedelta(days=3)).strftime('%Y-%m-%d')
+                },
+                # Strategy 3: Very broad search
+                {
+                    'apiKey': api_key,
+                    'q': 'tech',
+                    'sortBy': 'publishedAt',
+                    'language': 'en',
+                    'pageSize': 20,
+                    'from': (datetime.now() - timedelta(days=7)).strftime('%Y-%m-%d')
+                }
+            ]
+
+            # Hedge: if a strategy is slow (or comes back empty), start the next one
+            # without giving up on it - whichever finds articles first wins.
+            # Plain tasks (the cache already de-duplicates the whole news fetch),
+            # so cancelling the losers really does stop their requests
+            strategies = list(enumerate(query_attempts, 1))
+            running = set()
+            try:
+                while strategies or running:
+                    if strategies:
+                        i, params = strategies.pop(0)
+                        running.add(asyncio.create_task(self.get_news_strategy(session, news_url, i, params)))
+
+                    done, running = await asyncio.wait(
+                        running,
+                        timeout=self.config['news_hedge_delay'] if strategies else None,
+                        return_when=asyncio.FIRST_COMPLETED,
+                    )
+                    for task in done:
+                        good_articles = task.result()
+                        if good_articles:
                             return good_articles
-                        else:
-                            print(f"❌ Strategy {i+1} returned 0 articles")
+            finally:
+                for loser in running:
+                    loser.cancel()
 
-                print(f"❌ All strategies failed to find articles")
-                return None
+            log.warning("❌ All strategies failed to find articles")
+            return None
+
+        except Exception:
+            log.exception("❌ News API error")
+            return None
+
+    async def get_news_strategy(self, session, news_url, i, params):
+        """Run one NewsAPI query strategy - usable articles, or None"""
+        log.debug("📰 Trying query strategy", strategy=i,
+                  query=params.get('q'), sources=params.get('sources'), since=params['from'])
 
-        except Exception as e:
-            print(f"❌ News API error: {e}")
+        try:
+            async with session.get(news_url, params=params,
+                                   trace_request_ctx={'metric': 'http.news.everything'}) as response:
+                if response.status != 200:
+                    error_text = await response.text()
+                    log.warning("❌ News strategy failed", strategy=i, status=response.status, body=error_text)
+                    return None
+
+                data = await response.json()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            log.exception("❌ News strategy error", strategy=i)
             return None
 
+        articles = data.get('articles', [])
+        log.debug("📰 News strategy answered", strategy=i, articles=len(articles))
+
+        if not articles:
+            log.debug("❌ News strategy returned 0 articles", strategy=i)
+            return None
+
+        # Keep every usable article - the ones already shown get skipped when sending
+        good_articles = []
+        for article in articles:
+            if (article.get('title') and
+                article.get('url') and
+                article.get('title') != '[Removed]'):
+                good_articles.append(article)
+                log.debug("✅ Added article", title=article['title'][:50])
+
+        log.debug("✅ News strategy succeeded", strategy=i, articles=len(good_articles))
+        return good_articles or None
+
     async def get_stock_data(self):
         """Get stock data from Alpha Vantage API"""
         import os
 
-        api_key = os.environ.get('STOCK_API_KEY')
-        if not api_key:
-            print("❌ STOCK_API_KEY not set!")
+        if not os.environ.get('STOCK_API_KEY'):
+            log.error("❌ STOCK_API_KEY not set!")
             return None
 
         try:
-            stock_results = {}
-
-            async with aiohttp.ClientSession() as session:
-                for symbol in self.config['stocks']:
-                    # Get quote data for each stock
-                    stock_url = "https://www.alphavantage.co/query"
-                    params = {
-                        'function': 'GLOBAL_QUOTE',
-                        'symbol': symbol,
-                        'apikey': api_key
-                    }
-
-                    async with session.get(stock_url, params=params) as response:
-                        if response.status != 200:
-                            print(f"❌ Stock API failed for {symbol}: {response.status}")
-                            continue
-
-                        data = await response.json()
-                        quote = data.get('Global Quote', {})
-
-                        if not quote:
-                            print(f"❌ No stock data for {symbol}")
-                            continue
-
-                        # Extract relevant data
-                        try:
-                            price = float(quote.get('05. price', 0))
-                            change = float(quote.get('09. change', 0))
-                            change_percent = float(quote.get('10. change percent', '0%').replace('%', ''))
-
-                            stock_results[symbol] = {
-                                'price': price,
-                                'change': change,
-                                'change_percent': change_percent
-                            }
-                        except (ValueError, KeyError) as e:
-                            print(f"❌ Error parsing stock data for {symbol}: {e}")
-                            continue
-
-                    # Be nice to the API - small delay between requests
-                    await asyncio.sleep(0.2)
-
+            stock_results = await self.quotes.get_many(self.config['stocks'])
             return stock_results if stock_results else None
 
-        except Exception as e:
-            print(f"❌ Stock API error: {e}")
+        except Exception:
+            log.exception("❌ Stock API error")
             return None
+
+    async def fetch_quote(self, symbol):
+        """One GLOBAL_QUOTE lookup - the quote engine decides when this gets called"""
+        import os
+
+        session = await self.http()
+        stock_url = f"{self.config['stock_api_url']}/query"
+        params = {
+            'function': 'GLOBAL_QUOTE',
+            'symbol': symbol,
+            'apikey': os.environ.get('STOCK_API_KEY')
+        }
+
+        async with session.get(stock_url, params=params,
+                               trace_request_ctx={'metric': 'http.stocks.quote'}) as response:
+            if response.status != 200:
+                log.warning("❌ Stock API failed", symbol=symbol, status=response.status)
+                return None
+
+            data = await response.json()
+            quote = data.get('Global Quote', {})
+
+            if not quote:
+                # Alpha Vantage answers 200 with a "Note" when we're over the quota
+                log.warning("❌ No stock data", symbol=symbol, note=data.get('Note') or data.get('Information'))
+                return None
+
+            # Extract relevant data
+            try:
+                return {
+                    'price': float(quote.get('05. price', 0)),
+                    'change': float(quote.get('09. change', 0)),
+                    'change_percent': float(quote.get('10. change percent', '0%').replace('%', '')),
+                }
+            except (ValueError, KeyError) as e:
+                log.warning("❌ Error parsing stock data", symbol=symbol, error=str(e))
+                return None
+
+def format_age(seconds):
+    """'3 hours' style"""
+    for unit, size in (('day', 86400), ('hour', 3600), ('minute', 60)):
+        if seconds >= size:
+            count = int(seconds // size)
+            return f"{count} {unit}{'s' if count != 1 else ''}"
+    return "a moment"
+
+def article_url_key(article):
+    url = article.get('url', '').lower().split('#', 1)[0].rstrip('/')
+    return 'url:' + url.split('://', 1)[-1]
+
+def article_title_key(article):
+    return 'title:' + ' '.join(article.get('title', '').lower().split())
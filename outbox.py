@@ -0,0 +1,241 @@
+import asyncio
+import time
+from collections import deque
+
+import botlog
+from ratelimit import PriorityGate, TokenBucket
+
+log = botlog.get_logger('outbox')
+
+# Discord won't take anything longer than this in one message
+MESSAGE_LIMIT = 2000
+
+# What goes between merged sends so they still read like separate messages
+SEPARATOR = "\n\n"
+
+# Priority classes - lower goes first
+ALERT = 0     # timer finished and other time-critical stuff
+ANSWER = 1    # direct replies to what the user said
+FLAVOR = 2    # random encouragement, gifs... nice but skippable
+PRIORITIES = (ALERT, ANSWER, FLAVOR)
+
+class OutboundMessage:
+    """One queued send and the future that resolves to the message it landed in"""
+
+    __slots__ = ('target', 'content', 'own_message', 'priority', 'queued_at', 'future')
+
+    def __init__(self, target, content, own_message, priority, future):
+        self.target = target
+        self.content = content
+        self.own_message = own_message
+        self.priority = priority
+        self.queued_at = time.monotonic()
+        self.future = future
+
+class ChannelQueue:
+    """Pending sends for one channel, flushed best-priority-first by a single task"""
+
+    def __init__(self, outbox, key):
+        self.outbox = outbox
+        self.key = key
+        self.pending = {priority: deque() for priority in PRIORITIES}
+        self.flusher = None
+
+    def push(self, item):
+        self.pending[item.priority].append(item)
+        if self.flusher is None:
+            self.flusher = asyncio.create_task(self.flush())
+
+    def has_pending(self):
+        return any(self.pending.values())
+
+    def best_priority(self):
+        for priority in PRIORITIES:
+            if self.pending[priority]:
+                return priority
+        return FLAVOR
+
+    async def flush(self):
+        try:
+            # Give the handler a moment to queue up the rest of its burst
+            await asyncio.sleep(self.outbox.linger)
+            while self.has_pending():
+                # The batch is only picked once we're cleared to send, so anything
+                # urgent that showed up while we waited still goes out first
+                await self.outbox.clear_to_send(self.key, self.best_priority())
+                batch = self.take_batch()
+                if batch:
+                    await self.deliver(batch)
+        finally:
+            self.flusher = None
+            if self.has_pending():
+                # Something arrived while we were wrapping up
+                self.flusher = asyncio.create_task(self.flush())
+            else:
+                self.outbox.queues.pop(self.key, None)
+                self.outbox.forget_bucket(self.key)
+
+    async def deliver(self, batch):
+        content = SEPARATOR.join(item.content for item in batch)
+        try:
+            sent = None
+            for i, chunk in enumerate(split_content(content, self.outbox.limit)):
+                # Every message counts against the limits, not just the first
+                if i:
+                    await self.outbox.clear_to_send(self.key, batch[0].priority)
+                sent = await batch[0].target.send(chunk)
+        except Exception as e:
+            for item in batch:
+                if not item.future.done():
+                    item.future.set_exception(e)
+                    # Fire-and-forget senders never look, so don't warn about it
+                    item.future.exception()
+            log.exception("❌ Outbound send failed", channel=self.key, merged=len(batch))
+            return
+
+        if len(batch) > 1:
+            log.debug("📦 Coalesced sends", channel=self.key, merged=len(batch))
+            # Only batch[0]'s wrapper did the sending - the others' replies went out too
+            for target in {id(item.target): item.target for item in batch[1:]}.values():
+                mark_sent = getattr(target, 'mark_sent', None)
+                if mark_sent is not None:
+                    mark_sent()
+        for item in batch:
+            if not item.future.done():
+                item.future.set_result(sent)
+
+    def take_batch(self):
+        """As many queued sends as fit in one message, best priority first
+
+        Opt-outs always go alone, and flavor text that has been waiting too long
+        (because we're busy) is dropped instead of sent late.
+        """
+        batch = []
+        length = 0
+        now = time.monotonic()
+        for priority in PRIORITIES:
+            queue = self.pending[priority]
+            while queue:
+                item = queue[0]
+                if priority == FLAVOR and now - item.queued_at > self.outbox.flavor_max_delay:
+                    queue.popleft()
+                    if not item.future.done():
+                        item.future.set_result(None)
+                    log.debug("🗑️ Dropped stale flavor text", channel=self.key)
+                    continue
+
+                if batch and (item.own_message or batch[0].own_message or
+                              length + len(SEPARATOR) + len(item.content) > self.outbox.limit):
+                    return batch
+
+                batch.append(queue.popleft())
+                length += len(item.content) + (len(SEPARATOR) if len(batch) > 1 else 0)
+        return batch
+
+class Outbox:
+    """Per-channel outbound queues that merge bursts of sends into fewer messages
+
+    Sends are scheduled by priority (ALERT > ANSWER > FLAVOR) under token buckets
+    for each channel and for the bot as a whole, so a finished timer never waits
+    behind a pile of gifs when things get busy.
+    """
+
+    def __init__(self, limit=MESSAGE_LIMIT, linger=0.05,
+                 channel_rate=1.0, channel_burst=5, global_rate=40.0, global_burst=50,
+                 flavor_max_delay=5.0):
+        self.limit = limit
+        self.linger = linger
+        self.channel_rate = channel_rate
+        self.channel_burst = channel_burst
+        self.flavor_max_delay = flavor_max_delay
+        self.gate = PriorityGate(TokenBucket(global_rate, global_burst))
+        self.queues = {}
+        # Kept apart from the queues, which come and go with every burst - a new
+        # burst mustn't get a fresh allowance just because the last one drained
+        self.buckets = {}
+        self.sweep_at = 256     # tidy up the buckets when there get to be this many
+
+    def send(self, channel, content, own_message=False, priority=ANSWER):
+        """Queue content for a channel - returns a future for the sent message
+
+        own_message=True keeps the content in a message of its own, e.g. for a link
+        that should get its own preview. Dropped flavor text resolves to None.
+        """
+        key = channel_key(channel)
+        queue = self.queues.get(key)
+        if queue is None:
+            queue = self.queues[key] = ChannelQueue(self, key)
+
+        future = asyncio.get_running_loop().create_future()
+        queue.push(OutboundMessage(channel, str(content), own_message, priority, future))
+        return future
+
+    async def clear_to_send(self, key, priority):
+        """Wait for the channel's bucket, then for our turn under the global one"""
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            if len(self.buckets) >= self.sweep_at:
+                self.sweep_buckets()
+                self.sweep_at = max(256, 2 * len(self.buckets))
+            bucket = self.buckets[key] = TokenBucket(self.channel_rate, self.channel_burst)
+        await bucket.take()
+        await self.gate.acquire(priority)
+
+    def forget_bucket(self, key):
+        """Drop a channel's bucket once it has refilled - a new one would be the same"""
+        bucket = self.buckets.get(key)
+        if bucket is not None and bucket.time_until_available(self.channel_burst) == 0:
+            del self.buckets[key]
+
+    def sweep_buckets(self):
+        """Forget the refilled buckets of channels with nothing queued"""
+        for key in [key for key in self.buckets if key not in self.queues]:
+            self.forget_bucket(key)
+
+    async def drain(self):
+        """Wait until everything queued so far has been sent"""
+        while self.queues:
+            flushers = [queue.flusher for queue in list(self.queues.values()) if queue.flusher]
+            if not flushers:
+                break
+            await asyncio.gather(*flushers, return_exceptions=True)
+
+    def channel(self, channel):
+        """Wrap a channel so its .send goes through the outbox"""
+        return OutboxChannel(self, channel)
+
+class OutboxChannel:
+    """Drop-in for a channel: send() queues, send(wait=True) waits for delivery"""
+
+    def __init__(self, outbox, channel):
+        self.outbox = outbox
+        self.channel = channel
+
+    async def send(self, content=None, own_message=False, wait=False, priority=ANSWER, **kwargs):
+        # Embeds, files and friends skip the queue, but not the rate limits
+        if kwargs:
+            await self.outbox.clear_to_send(channel_key(self.channel), priority)
+            return await self.channel.send(content, **kwargs)
+
+        future = self.outbox.send(self.channel, content, own_message, priority)
+        if wait:
+            return await future
+        return future
+
+    def __getattr__(self, name):
+        return getattr(self.channel, name)
+
+def channel_key(channel):
+    return getattr(channel, 'id', None) or id(channel)
+
+def split_content(content, limit=MESSAGE_LIMIT):
+    """Split text into chunks under the limit, preferring line breaks"""
+    chunks = []
+    while len(content) > limit:
+        cut = content.rfind("\n", 0, limit)
+        if cut <= 0:
+            cut = limit
+        chunks.append(content[:cut])
+        content = content[cut:].lstrip("\n")
+    chunks.append(content)
+    return chunks
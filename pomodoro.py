@@ -1,29 +1,68 @@
 import asyncio
-import re
 import random
-from datetime import datetime, timedelta
+import time
+
+import botlog
+from history import SessionHistory
+from journal import Journal
+from outbox import ALERT, FLAVOR
+from timers import TimerWheel
+
+log = botlog.get_logger('pomodoro')
+
+# Every timer start/stop/finish goes here, so a restart doesn't lose them
+TIMER_JOURNAL_FILE = 'timers.journal'
+
+# Every finished or stopped session, for the focus stats
+SESSION_HISTORY_FILE = 'focus_history.bin'
+
+# Compact the journal once it has this many times more lines than live timers
+JOURNAL_COMPACT_RATIO = 4
+JOURNAL_COMPACT_MIN = 1000
 
 class PomodoroTimer:
-    """Individual timer instance"""
-    def __init__(self, user_id, duration_minutes, timer_type="study"):
+    """Individual timer instance - slots keep tens of thousands of them small"""
+
+    __slots__ = ('user_id', 'channel', 'channel_id', 'duration_minutes', 'timer_type',
+                 'start_time', 'end_time', 'is_active', 'handle')
+
+    def __init__(self, user_id, duration_minutes, timer_type="study", channel=None, channel_id=None):
         self.user_id = user_id
+        self.channel = channel          # where to say it's done
+        self.channel_id = channel_id    # ...and how to find it again after a restart
         self.duration_minutes = duration_minutes
         self.timer_type = timer_type
-        self.start_time = datetime.now()
-        self.end_time = self.start_time + timedelta(minutes=duration_minutes)
+        # Monotonic, so clock changes can't make a timer end early or late
+        self.start_time = time.monotonic()
+        self.end_time = self.start_time + duration_minutes * 60
         self.is_active = True
-        self.task = None
+        self.handle = None
 
     def time_remaining(self):
         if not self.is_active:
             return 0
-        remaining = self.end_time - datetime.now()
-        return max(0, remaining.total_seconds() / 60)
+        return max(0, (self.end_time - time.monotonic()) / 60)
 
     def stop(self):
         self.is_active = False
-        if self.task:
-            self.task.cancel()
+        if self.handle:
+            self.handle.cancel()
+
+    def started_at(self):
+        """Wall-clock (unix) time the timer started"""
+        return time.time() - (time.monotonic() - self.start_time)
+
+    def journal_record(self):
+        """Journal entry for this timer - the end is wall-clock time, since monotonic
+        time doesn't survive a restart"""
+        return {
+            'op': 'start',
+            'user': self.user_id,
+            'channel': self.channel_id,
+            'minutes': self.duration_minutes,
+            'type': self.timer_type,
+            'ends': time.time() + (self.end_time - time.monotonic()),
+        }
 
 class PomodoroFeature:
     """Handles pomodoro timers with natural language"""
@@ -32,6 +71,15 @@ class PomodoroFeature:
         self.personality = personality
         self.active_timers = {}
 
+        # Every timer shares one scheduler task instead of getting its own
+        self.scheduler = TimerWheel()
+
+        self.journal = Journal(TIMER_JOURNAL_FILE)
+        self.history = SessionHistory(SESSION_HISTORY_FILE)
+        self.compactor = None
+        self.restored = False
+        self.open_channel = None    # async (channel_id, user_id) -> channel, for restored timers
+
         # All the natural language patterns
         self.timer_patterns = [
             # Study patterns
@@ -73,6 +121,22 @@ class PomodoroFeature:
             r"take a (\d+) minute break",
         ]
 
+        # Focus stats - after study/break (those need a number), but before status/stop
+        # so "done" and "progress" don't steal them
+        self.history_patterns = [
+            ("focus_today", r"\b(focus(ed)?|stud(y|ied)|pomodoros?)\b.*\btoday\b"),
+            ("focus_today", r"\btoday'?s (focus|study|pomodoros?)\b"),
+            ("focus_week", r"\b(focus(ed)?|stud(y|ied)|pomodoros?)\b.*\bthis week\b"),
+            ("focus_week", r"\bweekly (focus|study|stats)\b"),
+            ("focus_streak", r"\bstreak\b"),
+            ("focus_average", r"\b(average|avg) (session|focus|study)"),
+            ("focus_average", r"how long are my sessions"),
+            ("focus_best_time", r"\bbest time (of day|to (study|focus))\b"),
+            ("focus_best_time", r"when do i (focus|study) best"),
+            ("focus_best_time", r"most productive (time|hour)"),
+            ("focus_stats", r"\b(focus|study) (stats|history|summary)\b"),
+        ]
+
         self.status_patterns = [
             r"time left",
             r"time remaining",
@@ -102,51 +166,51 @@ class PomodoroFeature:
             r"that's enough",
         ]
 
-    async def can_handle(self, message):
-        """Check if this feature can handle the message"""
-        # Check for any pomodoro-related keywords
-        keywords = [
+        # Same order as the old if-chain: study, break, status, stop (stats go just before status)
+        self.intents = (
+            [("study", pattern) for pattern in self.timer_patterns] +
+            [("break", pattern) for pattern in self.break_patterns] +
+            self.history_patterns +
+            [("status", pattern) for pattern in self.status_patterns] +
+            [("stop", pattern) for pattern in self.stop_patterns]
+        )
+
+        # Trigger keywords - these go into the shared keyword index
+        self.keywords = [
             'study', 'focus', 'work', 'timer', 'pomodoro', 'pomo', 'break',
             'rest', 'chill', 'relax', 'status', 'progress', 'stop', 'done',
-            'finished', 'cancel', 'time', 'minutes', 'min', 'grind'
+            'finished', 'cancel', 'time', 'minutes', 'min', 'grind',
+            'studied', 'streak', 'session', 'productive', 'weekly', 'stats'
         ]
 
-        return any(keyword in message.lower() for keyword in keywords)
+    async def can_handle(self, ctx):
+        """Check if this feature can handle the message"""
+        # The keyword index already scanned the message for us
+        return 'pomodoro' in ctx.keyword_hits
 
-    async def handle(self, message):
+    async def handle(self, ctx):
         """Handle pomodoro-related messages"""
-        content = message.content.lower().strip()
-
-        # Check for timer start (study)
-        for pattern in self.timer_patterns:
-            match = re.search(pattern, content)
-            if match:
-                duration = int(match.group(1))
-                await self.start_timer(message, duration, "study")
-                return
-
-        # Check for break timer
-        for pattern in self.break_patterns:
-            match = re.search(pattern, content)
-            if match:
-                duration = int(match.group(1))
-                await self.start_timer(message, duration, "break")
-                return
-
-        # Check for status
-        for pattern in self.status_patterns:
-            if re.search(pattern, content):
-                await self.check_status(message)
-                return
-
-        # Check for stop
-        for pattern in self.stop_patterns:
-            if re.search(pattern, content):
-                await self.stop_timer(message)
-                return
+        intent = ctx.intents.best('pomodoro')
+
+        if intent and intent.name in ("study", "break"):
+            duration = int(intent.group(1))
+            await self.start_timer(ctx, duration, intent.name)
+            return
+
+        if intent and intent.name.startswith("focus_"):
+            await self.show_history(ctx, intent.name)
+            return
+
+        if intent and intent.name == "status":
+            await self.check_status(ctx)
+            return
+
+        if intent and intent.name == "stop":
+            await self.stop_timer(ctx)
+            return
 
         # If no specific pattern matches, give a helpful response
-        await message.channel.send(
+        await ctx.channel.send(
             f"I think you want to do something with timers! {self.personality.random_emoji()}\n"
             f"Try saying: 'study for 25 minutes' or 'take a 5 minute break'!"
         )
@@ -160,27 +224,30 @@ class PomodoroFeature:
 • **Stop:** "stop timer", "done", "cancel"
 """
 
-    async def start_timer(self, message, duration, timer_type):
+    async def start_timer(self, ctx, duration, timer_type):
         """Start a new timer"""
-        user_id = message.author.id
+        user_id = ctx.author_id
 
         # Check if user already has active timer
         if user_id in self.active_timers and self.active_timers[user_id].is_active:
-            await message.channel.send(
+            await ctx.channel.send(
                 self.personality.error_response("already_active")
             )
             return
 
         # Validate duration
         if duration < 1 or duration > 240:
-            await message.channel.send(
+            await ctx.channel.send(
                 self.personality.error_response("duration")
             )
             return
 
         # Create timer
-        timer = PomodoroTimer(user_id, duration, timer_type)
+        channel_id = getattr(ctx.message.channel, 'id', None)
+        timer = PomodoroTimer(user_id, duration, timer_type, ctx.channel, channel_id)
         self.active_timers[user_id] = timer
+        timer.handle = self.scheduler.call_at(timer.end_time, self.timer_finished, timer)
+        self.record(timer.journal_record())
 
         # Send confirmation
         response = self.personality.success_response(
@@ -188,54 +255,126 @@ class PomodoroFeature:
             duration=duration, 
             timer_type=timer_type
         )
-        await message.channel.send(response)
+        await ctx.channel.send(response)
 
         # Random encouragement (70% chance)
         if random.random() < 0.7:
             await asyncio.sleep(1)
-            await message.channel.send(self.personality.encouragement())
+            await ctx.channel.send(self.personality.encouragement(), priority=FLAVOR)
+
+    async def timer_finished(self, timer):
+        """Called by the scheduler when a timer runs out"""
+        if not timer.is_active:
+            return
+
+        # Clean up first, so a new timer can start right away
+        timer.is_active = False
+        if self.active_timers.get(timer.user_id) is timer:
+            del self.active_timers[timer.user_id]
+            self.record({'op': 'done', 'user': timer.user_id})
+        self.history.record(timer.user_id, timer.started_at(), timer.duration_minutes, timer.timer_type, True)
+
+        channel = timer.channel or await self.find_channel(timer)
+        if channel is None:
+            log.warning("⚠️ Timer finished but its channel is gone", user=timer.user_id)
+            return
 
-        # Start countdown
-        timer.task = asyncio.create_task(self.timer_countdown(message, timer))
+        # Timer completed - this jumps the queue ahead of everything else
+        response = self.personality.success_response(
+            "timer_complete",
+            duration=timer.duration_minutes,
+            timer_type=timer.timer_type
+        )
+        await channel.send(response, priority=ALERT)
+
+        # Suggest next action
+        if timer.timer_type == "study":
+            suggestion = self.personality.suggestion("break_after_study")
+        else:
+            suggestion = self.personality.suggestion("study_after_break")
+        await channel.send(suggestion, priority=ALERT)
 
-    async def timer_countdown(self, message, timer):
-        """Handle timer countdown"""
+    async def find_channel(self, timer):
+        """Look up the channel of a timer restored from the journal"""
+        if self.open_channel is None:
+            return None
         try:
-            # Wait for timer duration
-            await asyncio.sleep(timer.duration_minutes * 60)
-
-            if timer.is_active:
-                # Timer completed
-                response = self.personality.success_response(
-                    "timer_complete",
-                    duration=timer.duration_minutes,
-                    timer_type=timer.timer_type
-                )
-                await message.channel.send(response)
-
-                # Suggest next action
-                await asyncio.sleep(1)
-                if timer.timer_type == "study":
-                    suggestion = self.personality.suggestion("break_after_study")
-                else:
-                    suggestion = self.personality.suggestion("study_after_break")
-                await message.channel.send(suggestion)
-
-                # Clean up
-                timer.stop()
-                if timer.user_id in self.active_timers:
-                    del self.active_timers[timer.user_id]
-
-        except asyncio.CancelledError:
-            # Timer was cancelled - this is normal
-            pass
-
-    async def check_status(self, message):
+            timer.channel = await self.open_channel(timer.channel_id, timer.user_id)
+        except Exception:
+            log.exception("❌ Could not find timer channel", user=timer.user_id)
+        return timer.channel
+
+    def record(self, entry):
+        """Journal a timer change, compacting the journal now and then"""
+        self.journal.append(entry)
+        self.maybe_compact()
+
+    def maybe_compact(self):
+        if (self.journal.records > max(JOURNAL_COMPACT_MIN, JOURNAL_COMPACT_RATIO * len(self.active_timers))
+                and self.compactor is None):
+            self.compactor = asyncio.create_task(self.compact())
+
+    async def compact(self):
+        """Rewrite the journal as just the timers that are still running"""
+        try:
+            await self.journal.rewrite(
+                lambda: [timer.journal_record() for timer in self.active_timers.values() if timer.is_active])
+        except OSError:
+            log.exception("❌ Could not compact timer journal")
+        finally:
+            self.compactor = None
+
+    async def restore(self, open_channel):
+        """Pick the journaled timers back up after a restart (call once connected)
+
+        Each one gets whatever time it had left; ones that ran out while we were
+        down go off right away. Channels are only looked up when a timer fires,
+        so this stays quick however many timers there are.
+        """
+        self.open_channel = open_channel
+        if self.restored:
+            return
+        self.restored = True
+
+        started = time.perf_counter()
+        live = {}
+        for entry in self.journal.replay():
+            if entry.get('op') == 'start':
+                live[entry['user']] = entry
+            else:
+                live.pop(entry.get('user'), None)
+
+        now_wall, now = time.time(), time.monotonic()
+        expired = 0
+        for entry in live.values():
+            if entry['user'] in self.active_timers:
+                continue    # already started a new one since we came back up
+            timer = PomodoroTimer(entry['user'], entry['minutes'], entry['type'], channel_id=entry['channel'])
+            timer.end_time = now + entry['ends'] - now_wall
+            timer.start_time = timer.end_time - entry['minutes'] * 60
+            self.active_timers[timer.user_id] = timer
+            # A deadline that's already passed fires on the wheel's next tick
+            timer.handle = self.scheduler.call_at(timer.end_time, self.timer_finished, timer)
+            expired += entry['ends'] <= now_wall
+
+        # Drop the replayed history if it's mostly finished timers
+        self.maybe_compact()
+        log.info("⏰ Timers restored", timers=len(live), expired=expired,
+                 ms=round((time.perf_counter() - started) * 1000, 1))
+
+    async def close(self):
+        """Make sure every journaled change is on disk (call on shutdown)"""
+        if self.compactor is not None:
+            await self.compactor
+        await self.journal.close()
+        self.history.close()
+
+    async def check_status(self, ctx):
         """Check timer status"""
-        user_id = message.author.id
+        user_id = ctx.author_id
 
         if user_id not in self.active_timers or not self.active_timers[user_id].is_active:
-            await message.channel.send(
+            await ctx.channel.send(
                 self.personality.success_response("no_timer")
             )
             return
@@ -244,7 +383,7 @@ class PomodoroFeature:
         remaining = timer.time_remaining()
 
         if remaining <= 0:
-            await message.channel.send(
+            await ctx.channel.send(
                 f"Perfect timing! {self.personality.random_emoji()} Your timer just finished!"
             )
             return
@@ -265,14 +404,14 @@ class PomodoroFeature:
             time_str=time_str,
             timer_type=timer.timer_type
         )
-        await message.channel.send(response)
+        await ctx.channel.send(response)
 
-    async def stop_timer(self, message):
+    async def stop_timer(self, ctx):
         """Stop active timer"""
-        user_id = message.author.id
+        user_id = ctx.author_id
 
         if user_id not in self.active_timers or not self.active_timers[user_id].is_active:
-            await message.channel.send(
+            await ctx.channel.send(
                 self.personality.success_response("no_timer")
             )
             return
@@ -280,9 +419,50 @@ class PomodoroFeature:
         timer = self.active_timers[user_id]
         timer.stop()
         del self.active_timers[user_id]
+        self.record({'op': 'stop', 'user': user_id})
+
+        # The part they did still counts (a few seconds before changing their mind doesn't)
+        done = min(timer.duration_minutes, (time.monotonic() - timer.start_time) / 60)
+        if done >= 1:
+            self.history.record(user_id, timer.started_at(), done, timer.timer_type, False)
 
         response = self.personality.success_response(
             "timer_stopped",
             timer_type=timer.timer_type
         )
-        await message.channel.send(response)
+        await ctx.channel.send(response)
+
+    async def show_history(self, ctx, intent_name):
+        """Answer a focus stats question from the session history"""
+        stats = self.history.summary(ctx.author_id)
+        emoji = self.personality.random_emoji()
+
+        if not stats['sessions']:
+            await ctx.channel.send(
+                f"No study sessions on record yet! {emoji} Try 'study for 25 minutes' and I'll keep count~"
+            )
+            return
+
+        lines = {
+            'focus_today': f"📚 Today: **{format_minutes(stats['today'])}** of focus",
+            'focus_week': f"🗓️ This week: **{format_minutes(stats['week'])}** of focus",
+            'focus_streak': f"🔥 Streak: **{stats['streak']} day{'s' if stats['streak'] != 1 else ''}** in a row",
+            'focus_average': f"⏱️ Average session: **{format_minutes(stats['average'])}** "
+                             f"over {stats['sessions']} session{'s' if stats['sessions'] != 1 else ''}",
+            'focus_best_time': f"🌟 You focus most around **{format_hour(stats['best_hour'])}**",
+        }
+
+        if intent_name in lines:
+            await ctx.channel.send(f"{lines[intent_name]} {emoji}")
+        else:
+            await ctx.channel.send(f"**Your focus stats** {emoji}\n" + "\n".join(lines.values()))
+
+def format_minutes(minutes):
+    """'1h 25m' style"""
+    minutes = int(round(minutes))
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}h {minutes}m" if hours else f"{minutes}m"
+
+def format_hour(hour):
+    """'5 PM' style"""
+    return f"{hour % 12 or 12} {'AM' if hour < 12 else 'PM'}"
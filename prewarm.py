@@ -0,0 +1,91 @@
+import asyncio
+from datetime import date, datetime, timedelta
+
+import botlog
+from storage import load_json, save_json
+
+log = botlog.get_logger('prewarm')
+
+HISTORY_FILE = 'digest_days.json'
+
+class Prewarmer:
+    """Runs a warm-up job a few minutes before the user's wake time
+
+    It remembers which weekdays the user actually asked for their digest and
+    skips the ones they haven't in a while, so we don't burn API quota on
+    mornings nobody looks. For the first week it warms every day while it learns.
+    """
+
+    def __init__(self, warm, wake_time, lead_minutes=10, learn_days=7, forget_days=28):
+        self.warm = warm                    # async () -> None
+        self.wake_time = wake_time          # "HH:MM" local time, or None for off
+        self.lead_minutes = lead_minutes
+        self.learn_days = learn_days
+        self.forget_days = forget_days
+        self.task = None
+
+        history = load_json(HISTORY_FILE, {})
+        self.since = date.fromisoformat(history.get('since', date.today().isoformat()))
+        # weekday (0 = Monday) -> last date the digest was asked for on that day
+        self.last_asked = {int(day): date.fromisoformat(asked)
+                           for day, asked in history.get('last_asked', {}).items()}
+        if 'since' not in history:
+            self.save()
+
+    def record_request(self, today=None):
+        """Remember that the user wanted their digest today"""
+        today = today or date.today()
+        if self.last_asked.get(today.weekday()) == today:
+            return
+        self.last_asked[today.weekday()] = today
+        self.save()
+
+    def save(self):
+        save_json(HISTORY_FILE, {
+            'since': self.since.isoformat(),
+            'last_asked': {str(day): asked.isoformat() for day, asked in self.last_asked.items()},
+        })
+
+    def wanted_on(self, day):
+        """Should we warm up on this date?"""
+        if (day - self.since).days < self.learn_days:
+            return True
+        asked = self.last_asked.get(day.weekday())
+        return asked is not None and (day - asked).days <= self.forget_days
+
+    def next_run(self, now=None):
+        """When the next warm-up should happen (local time)"""
+        now = now or datetime.now()
+        hour, minute = (int(part) for part in self.wake_time.split(':'))
+        run = now.replace(hour=hour, minute=minute, second=0, microsecond=0) - timedelta(minutes=self.lead_minutes)
+        if run <= now:
+            run += timedelta(days=1)
+        return run
+
+    def start(self):
+        if self.wake_time and self.task is None:
+            self.task = asyncio.create_task(self.loop())
+
+    def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+
+    async def loop(self):
+        run = None
+        while True:
+            # Never pick the same slot twice, even if the sleep woke us a hair early
+            now = datetime.now()
+            run = self.next_run(max(now, run) if run else now)
+            log.debug("⏰ Next digest warm-up", at=run.isoformat(timespec='minutes'))
+            await asyncio.sleep(max(0, (run - datetime.now()).total_seconds()))
+
+            if not self.wanted_on(run.date()):
+                log.debug("😴 Skipping warm-up, not asked on this weekday lately", day=run.strftime('%A'))
+                continue
+
+            try:
+                await self.warm()
+                log.info("🔥 Digest warmed up for the morning")
+            except Exception:
+                log.exception("❌ Digest warm-up failed")
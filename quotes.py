@@ -0,0 +1,86 @@
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+from datetime import time as clock
+
+import botlog
+from ratelimit import TokenBucket
+from singleflight import SingleFlight
+
+log = botlog.get_logger('quotes')
+
+try:
+    from zoneinfo import ZoneInfo
+    MARKET_TZ = ZoneInfo('America/New_York')
+except Exception:
+    # No tz database around - standard time is close enough for a cache TTL
+    MARKET_TZ = timezone(timedelta(hours=-5))
+
+MARKET_OPEN = clock(9, 30)
+MARKET_CLOSE = clock(16, 0)
+
+def market_open(now=None):
+    """Is the US stock market trading right now? (ignores holidays)"""
+    now = now or datetime.now(MARKET_TZ)
+    if now.weekday() >= 5:
+        return False
+    return MARKET_OPEN <= now.time() < MARKET_CLOSE
+
+class QuoteEngine:
+    """Fetches stock quotes concurrently without going over the provider's quota
+
+    Every request to the provider takes a token from a bucket sized to the quota,
+    and each quote is remembered for a while - briefly while the market is open,
+    much longer when prices can't move anyway.
+    """
+
+    def __init__(self, fetch_quote, requests_per_minute=5, burst=5,
+                 market_ttl=60, closed_ttl=30 * 60):
+        self.fetch_quote = fetch_quote      # async (symbol) -> quote dict or None
+        self.bucket = TokenBucket(requests_per_minute / 60, burst)
+        self.market_ttl = market_ttl
+        self.closed_ttl = closed_ttl
+        self.quotes = {}                    # symbol -> (fetched_at, quote)
+        self.turn = asyncio.Lock()          # hands out tokens in watchlist order
+        self.flights = SingleFlight('quotes')
+
+    def ttl(self):
+        return self.market_ttl if market_open() else self.closed_ttl
+
+    def cached(self, symbol):
+        """A quote that's still fresh enough to reuse, or None"""
+        entry = self.quotes.get(symbol)
+        if entry and time.monotonic() - entry[0] < self.ttl():
+            return entry[1]
+        return None
+
+    async def get(self, symbol):
+        quote = self.cached(symbol)
+        if quote is not None:
+            return quote
+        # Two digests asking for the same ticker at once share one request (and one token)
+        return await self.flights.do(symbol, lambda: self.load(symbol))
+
+    async def load(self, symbol):
+        async with self.turn:
+            await self.bucket.take()
+        quote = await self.fetch_quote(symbol)
+        if quote is not None:
+            self.quotes[symbol] = (time.monotonic(), quote)
+        return quote
+
+    async def get_many(self, symbols):
+        """{symbol: quote} for every symbol we could get, fetched side by side"""
+        symbols = list(dict.fromkeys(symbols))
+        hits = sum(1 for symbol in symbols if self.cached(symbol) is not None)
+        log.debug("📈 Fetching quotes", symbols=len(symbols), cached=hits)
+
+        results = await asyncio.gather(*(self.get(symbol) for symbol in symbols), return_exceptions=True)
+
+        quotes = {}
+        for symbol, result in zip(symbols, results):
+            if isinstance(result, Exception):
+                log.warning("❌ Quote fetch failed", symbol=symbol, error=str(result))
+            elif result is not None:
+                quotes[symbol] = result
+        return quotes
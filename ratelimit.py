@@ -0,0 +1,75 @@
+import asyncio
+import heapq
+import itertools
+import time
+
+class TokenBucket:
+    """Classic token bucket: `rate` tokens per second, holding at most `capacity`"""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_take(self, tokens=1):
+        """Take tokens if there are enough right now"""
+        self.refill()
+        if self.tokens >= tokens:
+            self.tokens -= tokens
+            return True
+        return False
+
+    def time_until_available(self, tokens=1):
+        """Seconds until `tokens` could be taken (0 if they can be taken now)"""
+        self.refill()
+        if self.tokens >= tokens:
+            return 0.0
+        return (tokens - self.tokens) / self.rate
+
+    async def take(self, tokens=1):
+        """Wait for tokens, first come first served"""
+        while not self.try_take(tokens):
+            await asyncio.sleep(self.time_until_available(tokens))
+
+class PriorityGate:
+    """Hands out tokens from a shared bucket, lowest priority number first"""
+
+    def __init__(self, bucket):
+        self.bucket = bucket
+        self.waiters = []   # heap of (priority, order, future)
+        self.order = itertools.count()
+        self.pump_task = None
+
+    async def acquire(self, priority):
+        if not self.waiters and self.bucket.try_take():
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self.waiters, (priority, next(self.order), future))
+        if self.pump_task is None:
+            self.pump_task = asyncio.create_task(self.pump())
+        await future
+
+    def backlog(self):
+        return len(self.waiters)
+
+    async def pump(self):
+        try:
+            while self.waiters:
+                wait = self.bucket.time_until_available()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                    continue
+
+                _, _, future = heapq.heappop(self.waiters)
+                if not future.done():
+                    self.bucket.try_take()
+                    future.set_result(None)
+        finally:
+            self.pump_task = None
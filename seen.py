@@ -0,0 +1,66 @@
+import hashlib
+from collections import OrderedDict
+
+from storage import load_json, save_json
+
+class SeenSet:
+    """Bounded memory of things we've already shown (headlines, links...)
+
+    Only an 8-byte hash of each key is kept, oldest forgotten first, so a few
+    thousand entries stay tiny on disk and in memory.
+    """
+
+    def __init__(self, max_items=2000, snapshot_file=None, saved=None):
+        self.max_items = max_items
+        self.snapshot_file = snapshot_file
+        if saved is None:
+            saved = load_json(snapshot_file, []) if snapshot_file else []
+        self.hashes = OrderedDict.fromkeys(saved[-max_items:])
+
+    @staticmethod
+    def digest(key):
+        return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), 'big')
+
+    def add(self, key):
+        digest = self.digest(key)
+        self.hashes[digest] = None
+        self.hashes.move_to_end(digest)
+        while len(self.hashes) > self.max_items:
+            self.hashes.popitem(last=False)
+
+    def save(self):
+        if self.snapshot_file:
+            save_json(self.snapshot_file, list(self.hashes))
+
+    def __contains__(self, key):
+        return self.digest(key) in self.hashes
+
+    def __len__(self):
+        return len(self.hashes)
+
+class SeenSets:
+    """A SeenSet per user (so one user's digest doesn't hide headlines from
+    everyone else's), snapshotted together in one file"""
+
+    def __init__(self, max_items=2000, snapshot_file=None):
+        self.max_items = max_items
+        self.snapshot_file = snapshot_file
+        saved = load_json(snapshot_file, {}) if snapshot_file else {}
+        if not isinstance(saved, dict):
+            saved = {}  # the old shared list - no telling whose it was
+        self.sets = {user: SeenSet(max_items, saved=hashes) for user, hashes in saved.items()}
+
+    def get(self, user_id):
+        """The SeenSet for a user (an empty one the first time)"""
+        user = str(user_id)   # JSON keys are strings anyway
+        seen = self.sets.get(user)
+        if seen is None:
+            seen = self.sets[user] = SeenSet(self.max_items, saved=[])
+        return seen
+
+    def save(self):
+        if self.snapshot_file:
+            save_json(self.snapshot_file, {user: list(seen.hashes) for user, seen in self.sets.items()})
+
+    def __len__(self):
+        return len(self.sets)
@@ -0,0 +1,69 @@
+import time
+from collections import OrderedDict
+
+class Session:
+    """Per-user conversation state - slots keep each one small"""
+
+    __slots__ = ('user_id', 'mode', 'mode_duration', 'rant_active', 'last_intent', 'last_seen')
+
+    def __init__(self, user_id):
+        self.user_id = user_id
+        self.mode = "normal"
+        self.mode_duration = 0      # messages left before the mode wears off
+        self.rant_active = False
+        self.last_intent = None
+        self.last_seen = time.monotonic()
+
+    def set_mode(self, mode, duration=5):
+        self.mode = mode
+        self.mode_duration = duration
+
+    def __repr__(self):
+        return f"Session(user={self.user_id}, mode={self.mode}, rant={self.rant_active})"
+
+class SessionStore:
+    """Sessions keyed by user id, with LRU + idle-timeout eviction
+
+    The OrderedDict is kept in last-seen order, so the stalest session is always at
+    the front: lookups are O(1) and expiry only ever looks at the front entries.
+    """
+
+    def __init__(self, max_sessions=10000, ttl=6 * 60 * 60):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.sessions = OrderedDict()
+
+    def get(self, user_id):
+        """Get (or start) a user's session and mark it as just used"""
+        now = time.monotonic()
+        self.expire(now)
+
+        session = self.sessions.get(user_id)
+        if session is None:
+            session = self.sessions[user_id] = Session(user_id)
+            if len(self.sessions) > self.max_sessions:
+                self.sessions.popitem(last=False)
+        else:
+            self.sessions.move_to_end(user_id)
+
+        session.last_seen = now
+        return session
+
+    def peek(self, user_id):
+        """Look at a session without creating it or bumping it"""
+        return self.sessions.get(user_id)
+
+    def expire(self, now=None):
+        """Drop sessions nobody has touched for `ttl` seconds"""
+        now = time.monotonic() if now is None else now
+        while self.sessions:
+            oldest = next(iter(self.sessions.values()))
+            if now - oldest.last_seen < self.ttl:
+                break
+            self.sessions.popitem(last=False)
+
+    def __len__(self):
+        return len(self.sessions)
+
+    def __contains__(self, user_id):
+        return user_id in self.sessions
@@ -0,0 +1,48 @@
+import asyncio
+
+import botlog
+
+log = botlog.get_logger('singleflight')
+
+class SingleFlight:
+    """Collapses identical concurrent calls into one
+
+    While a call for a key is in flight, anyone else asking for the same key
+    waits on that call instead of starting their own. Once it finishes the key
+    is free again - this is de-duplication, not caching.
+    """
+
+    def __init__(self, name='flight'):
+        self.name = name
+        self.calls = {}     # key -> task
+        self.shared = 0     # callers that piggybacked on someone else's call
+
+    def start(self, key, fetch):
+        """The task running `fetch()` for key - only a new one if none is in flight"""
+        task = self.calls.get(key)
+        if task is not None:
+            self.shared += 1
+            log.debug("🛬 Joining in-flight call", flight=self.name, key=key)
+            return task
+
+        task = self.calls[key] = asyncio.create_task(fetch())
+
+        def done(finished):
+            if self.calls.get(key) is finished:
+                del self.calls[key]
+            # If every caller gave up, nobody else will look at the error
+            if not finished.cancelled():
+                finished.exception()
+
+        task.add_done_callback(done)
+        return task
+
+    async def do(self, key, fetch):
+        """Run (or join) the call for key - one caller giving up doesn't cancel it for the rest"""
+        return await asyncio.shield(self.start(key, fetch))
+
+    def __contains__(self, key):
+        return key in self.calls
+
+    def __len__(self):
+        return len(self.calls)
@@ -0,0 +1,188 @@
+"""Local stand-in for the weather, news and stock APIs the morning digest uses
+
+Replays the recorded responses in fixtures/ so the digest can be run, load-tested
+and benchmarked without any API keys or network - including when the providers
+are slow, flaky or rate limiting us.
+
+    python standin.py --port 8080 --latency 0.3 --error-rate 0.1 --throttle-every 20 --throttle-burst 5
+
+Then point Calliope at it:
+
+    OPENWEATHER_BASE_URL=http://127.0.0.1:8080 NEWS_API_BASE_URL=http://127.0.0.1:8080 \
+    STOCK_API_BASE_URL=http://127.0.0.1:8080 python main.py
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+import zlib
+
+from aiohttp import web
+
+import botlog
+
+log = botlog.get_logger('standin')
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+class StandIn:
+    """aiohttp app serving fixtures, with injectable latency, errors and 429 bursts"""
+
+    def __init__(self, fixtures_dir=FIXTURES_DIR, latency=0.0, jitter=0.0, error_rate=0.0,
+                 throttle_every=0, throttle_burst=0, seed=1234):
+        self.latency = latency                  # seconds added to every response
+        self.jitter = jitter                    # ...plus up to this much at random
+        self.error_rate = error_rate            # fraction of requests that get a 500
+        self.throttle_every = throttle_every    # after this many requests...
+        self.throttle_burst = throttle_burst    # ...this many in a row get a 429
+        self.rng = random.Random(seed)
+        self.requests = 0
+        self.counts = {}                        # endpoint -> requests served
+        self.runner = None
+
+        self.fixtures = {}
+        for name in ('geocode', 'weather', 'forecast', 'everything', 'global_quote'):
+            with open(os.path.join(fixtures_dir, f'{name}.json')) as f:
+                self.fixtures[name] = json.load(f)
+
+    def app(self):
+        app = web.Application(middlewares=[self.misbehave])
+        app.router.add_get('/geo/1.0/direct', self.geocode)
+        app.router.add_get('/data/2.5/weather', self.weather)
+        app.router.add_get('/data/2.5/forecast', self.forecast)
+        app.router.add_get('/v2/everything', self.everything)
+        app.router.add_get('/query', self.query)
+        return app
+
+    async def start(self, host='127.0.0.1', port=0):
+        """Start serving - returns the base URL (port=0 picks a free port)"""
+        self.runner = web.AppRunner(self.app())
+        await self.runner.setup()
+        await web.TCPSite(self.runner, host, port).start()
+        host, port = self.runner.addresses[0][:2]
+        base_url = f"http://{host}:{port}"
+        log.info("🎭 Provider stand-in up", url=base_url)
+        return base_url
+
+    async def stop(self):
+        if self.runner is not None:
+            await self.runner.cleanup()
+            self.runner = None
+
+    @web.middleware
+    async def misbehave(self, request, handler):
+        """Latency, 429 bursts and random 500s, in that order"""
+        self.requests += 1
+        self.counts[request.path] = self.counts.get(request.path, 0) + 1
+
+        delay = self.latency + (self.rng.random() * self.jitter if self.jitter else 0)
+        if delay:
+            await asyncio.sleep(delay)
+
+        if self.throttle_every and self.throttle_burst:
+            if self.requests % (self.throttle_every + self.throttle_burst) >= self.throttle_every:
+                return web.json_response({'message': 'Too many requests'}, status=429)
+
+        if self.error_rate and self.rng.random() < self.error_rate:
+            return web.json_response({'message': 'Internal error'}, status=500)
+
+        return await handler(request)
+
+    def check_key(self, request, param):
+        if not request.query.get(param):
+            raise web.HTTPUnauthorized(text=json.dumps({'cod': 401, 'message': 'Invalid API key'}),
+                                       content_type='application/json')
+
+    async def geocode(self, request):
+        self.check_key(request, 'appid')
+        # Only the city part matters here, like the real thing is fairly forgiving
+        city = request.query.get('q', '').split(',')[0].strip().lower()
+        matches = [place for place in self.fixtures['geocode'] if place['name'].lower() == city]
+        return web.json_response(matches[:int(request.query.get('limit', 5))])
+
+    async def weather(self, request):
+        self.check_key(request, 'appid')
+        return web.json_response(self.fixtures['weather'])
+
+    async def forecast(self, request):
+        self.check_key(request, 'appid')
+        # Slide the recording forward by whole days so it covers today (and the
+        # warm afternoons stay in the afternoon)
+        recorded = self.fixtures['forecast']
+        shift = (int(time.time()) - recorded['list'][0]['dt']) // 86400 * 86400
+        entries = []
+        for entry in recorded['list']:
+            entry = dict(entry, dt=entry['dt'] + shift)
+            entry['dt_txt'] = time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(entry['dt']))
+            entries.append(entry)
+        return web.json_response(dict(recorded, list=entries))
+
+    async def everything(self, request):
+        self.check_key(request, 'apiKey')
+        articles = self.fixtures['everything']['articles']
+        sources = request.query.get('sources')
+        if sources:
+            wanted = set(sources.split(','))
+            articles = [article for article in articles if article['source']['id'] in wanted]
+        articles = articles[:int(request.query.get('pageSize', 20))]
+        return web.json_response({'status': 'ok', 'totalResults': len(articles), 'articles': articles})
+
+    async def query(self, request):
+        self.check_key(request, 'apikey')
+        if request.query.get('function') != 'GLOBAL_QUOTE':
+            return web.json_response({'Error Message': 'Invalid API call.'})
+
+        symbol = request.query.get('symbol', '').upper()
+        recorded = self.fixtures['global_quote'].get(symbol)
+        return web.json_response(recorded or made_up_quote(symbol))
+
+def made_up_quote(symbol):
+    """A stable fake quote for tickers we have no recording of (for big watchlists)"""
+    seed = zlib.crc32(symbol.encode())
+    price = 20 + seed % 480
+    change = ((seed >> 9) % 1000 - 500) / 100
+    previous = price - change
+    return {'Global Quote': {
+        '01. symbol': symbol,
+        '05. price': f"{price:.4f}",
+        '08. previous close': f"{previous:.4f}",
+        '09. change': f"{change:.4f}",
+        '10. change percent': f"{change / previous * 100:.4f}%",
+    }}
+
+async def serve(args):
+    standin = StandIn(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+                      throttle_every=args.throttle_every, throttle_burst=args.throttle_burst, seed=args.seed)
+    base_url = await standin.start(args.host, args.port)
+    print(f"🎭 Serving fixtures on {base_url} (Ctrl+C to stop)")
+    for name in ('OPENWEATHER_BASE_URL', 'NEWS_API_BASE_URL', 'STOCK_API_BASE_URL'):
+        print(f"   {name}={base_url}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await standin.stop()
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline stand-in for the morning digest APIs")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--latency', type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument('--jitter', type=float, default=0.0, help="extra random latency, up to this many seconds")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="fraction of requests that fail with a 500")
+    parser.add_argument('--throttle-every', type=int, default=0, help="serve this many requests normally...")
+    parser.add_argument('--throttle-burst', type=int, default=0, help="...then answer this many with a 429")
+    parser.add_argument('--seed', type=int, default=1234)
+    args = parser.parse_args()
+
+    botlog.setup()
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        botlog.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+import json
+import os
+
+import botlog
+
+log = botlog.get_logger('storage')
+
+# Everything Calliope remembers between restarts lives in here
+DATA_DIR = os.environ.get('CALLIOPE_DATA_DIR', 'data')
+
+def data_path(name):
+    """Path to a file in the data dir (creating the dir if needed)"""
+    os.makedirs(DATA_DIR, exist_ok=True)
+    return os.path.join(DATA_DIR, name)
+
+def load_json(name, default=None):
+    """Read a JSON file from the data dir, or `default` if it's missing or broken"""
+    try:
+        with open(data_path(name)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return default
+    except (OSError, ValueError):
+        log.warning("⚠️ Could not read saved data, starting fresh", file=name)
+        return default
+
+def save_json(name, data):
+    """Write a JSON file to the data dir atomically (write a temp file, then swap it in)"""
+    path = data_path(name)
+    tmp_path = path + '.tmp'
+    try:
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+    except OSError:
+        log.exception("❌ Could not save data", file=name)
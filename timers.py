@@ -0,0 +1,119 @@
+import asyncio
+import math
+import time
+
+import botlog
+
+log = botlog.get_logger('timers')
+
+class TimerHandle:
+    """One scheduled callback - slots keep tens of thousands of these small"""
+
+    __slots__ = ('wheel', 'deadline', 'tick', 'callback', 'args')
+
+    def __init__(self, wheel, deadline, tick, callback, args):
+        self.wheel = wheel
+        self.deadline = deadline    # time.monotonic() when it should fire
+        self.tick = tick
+        self.callback = callback
+        self.args = args
+
+    def cancel(self):
+        """Unschedule (does nothing if it already fired or was cancelled)"""
+        if self.wheel is not None:
+            self.wheel.cancel(self)
+
+    def remaining(self):
+        """Seconds until it fires"""
+        return max(0.0, self.deadline - time.monotonic())
+
+class TimerWheel:
+    """Hashed timing wheel: one task on the monotonic clock drives every timer
+
+    Time is cut into ticks and each tick maps to one of `slots` buckets (a dict,
+    so adding or cancelling a timer is O(1)). Every tick the task looks at the
+    one bucket that's due and fires whatever has reached its deadline - timers
+    further out than one turn of the wheel just wait for a later pass. Timers fire
+    at most one tick late, and the task only runs while something is scheduled.
+    """
+
+    def __init__(self, tick=0.1, slots=4096):
+        self.tick = tick
+        self.buckets = [{} for _ in range(slots)]
+        self.origin = time.monotonic()
+        self.current = 0            # next tick to process
+        self.count = 0
+        self.runner = None
+        self.running = set()        # coroutine callbacks that are still going
+
+    def tick_for(self, when):
+        """The tick that's underway at `when`"""
+        return int((when - self.origin) / self.tick)
+
+    def call_later(self, delay, callback, *args):
+        """Run callback(*args) after `delay` seconds - it may be a coroutine function"""
+        return self.call_at(time.monotonic() + delay, callback, *args)
+
+    def call_at(self, deadline, callback, *args):
+        """Run callback(*args) at a time.monotonic() deadline"""
+        if self.runner is None and not self.count:
+            # Idle wheel - nothing has been ticking, so catch the clock up first
+            self.current = self.tick_for(time.monotonic())
+
+        # First tick that starts at or after the deadline (never one already passed)
+        tick = max(math.ceil((deadline - self.origin) / self.tick), self.current)
+        handle = TimerHandle(self, deadline, tick, callback, args)
+        self.buckets[tick % len(self.buckets)][handle] = None
+        self.count += 1
+
+        if self.runner is None:
+            self.runner = asyncio.create_task(self.run())
+        return handle
+
+    def cancel(self, handle):
+        bucket = self.buckets[handle.tick % len(self.buckets)]
+        if handle in bucket:
+            del bucket[handle]
+            self.count -= 1
+        handle.wheel = None
+
+    async def run(self):
+        try:
+            while self.count:
+                now = time.monotonic()
+                due = self.tick_for(now)
+                while self.current <= due and self.count:
+                    self.fire(self.buckets[self.current % len(self.buckets)])
+                    self.current += 1
+
+                # Sleep until the next tick starts
+                next_tick = self.origin + self.current * self.tick
+                await asyncio.sleep(max(0.0, next_tick - time.monotonic()))
+        finally:
+            self.runner = None
+
+    def fire(self, bucket):
+        if not bucket:
+            return
+        # Only the ones whose turn it is - the rest are a lap (or more) away
+        ready = [handle for handle in bucket if handle.tick <= self.current]
+        for handle in ready:
+            del bucket[handle]
+            self.count -= 1
+            handle.wheel = None
+            try:
+                result = handle.callback(*handle.args)
+                if asyncio.iscoroutine(result):
+                    task = asyncio.create_task(result)
+                    self.running.add(task)
+                    task.add_done_callback(self.finished)
+            except Exception:
+                log.exception("❌ Timer callback failed")
+
+    def finished(self, task):
+        self.running.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            log.error("❌ Timer callback failed", error=repr(task.exception()))
+
+    def __len__(self):
+        return self.count